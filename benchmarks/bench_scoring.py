@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from bot.domain.scoring import ScoringEngine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сравнение ScoringEngine.score и ScoringEngine.score_batch.")
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    campaigns = rng.integers(0, 40, args.size)
+    geo = rng.integers(0, 8, args.size)
+    creatives = rng.integers(0, 6, args.size)
+    accounts = rng.integers(0, 8, args.size)
+    engine = ScoringEngine()
+
+    started = time.perf_counter()
+    scalar = [
+        engine.score("🟢", c, g, cr, a).average
+        for c, g, cr, a in zip(campaigns.tolist(), geo.tolist(), creatives.tolist(), accounts.tolist())
+    ]
+    scalar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = engine.score_batch(campaigns, geo, creatives, accounts)
+    batch_seconds = time.perf_counter() - started
+
+    if not np.array_equal(np.asarray(scalar), batch.average):
+        raise SystemExit("score_batch diverged from score")
+
+    print(f"answers: {args.size}")
+    print(f"scalar:  {scalar_seconds:.3f}s ({scalar_seconds / args.size * 1e9:.0f} ns/answer)")
+    print(f"batch:   {batch_seconds:.3f}s ({batch_seconds / args.size * 1e9:.0f} ns/answer)")
+    print(f"speedup: {scalar_seconds / batch_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import available_timezones
+
+from bot.utils.timezone import SURVEY_TIME, NextFireTable, tzinfo_from_stored
+
+# Прежний путь без кэшей: разбор строки таймзоны и пересчет 20:00 на каждого пользователя.
+_resolve_uncached = tzinfo_from_stored.__wrapped__
+
+
+def legacy_next_run(user_timezone: str, now_utc: datetime) -> tuple[date, date, datetime]:
+    tz = _resolve_uncached(user_timezone)
+    now_local = now_utc.astimezone(tz)
+    today_target_local = datetime.combine(now_local.date(), SURVEY_TIME, tzinfo=tz)
+    if now_local < today_target_local:
+        target_local = today_target_local
+    else:
+        target_local = datetime.combine(now_local.date() + timedelta(days=1), SURVEY_TIME, tzinfo=tz)
+    return now_local.date(), target_local.date(), target_local.astimezone(timezone.utc)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Стоимость расчета ближайшей рассылки на пользователя: прежний пересчет против NextFireTable."
+    )
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    zones = sorted(available_timezones()) + [f"UTC{offset:+d}" for offset in range(-12, 15)]
+    rng = random.Random(args.seed)
+    users = [rng.choice(zones) for _ in range(args.users)]
+    now_utc = datetime.now(tz=timezone.utc)
+
+    started = time.perf_counter()
+    legacy = [legacy_next_run(user_timezone, now_utc) for user_timezone in users]
+    legacy_seconds = time.perf_counter() - started
+
+    table = NextFireTable()
+    started = time.perf_counter()
+    slots = [table.get(user_timezone, now_utc) for user_timezone in users]
+    table_seconds = time.perf_counter() - started
+
+    # Повторный проход — как следующая сверка или /result в те же сутки: таблица уже заполнена.
+    started = time.perf_counter()
+    for user_timezone in users:
+        table.get(user_timezone, now_utc)
+    warm_seconds = time.perf_counter() - started
+
+    if legacy != [(slot.local_date, slot.target_date, slot.fire_at) for slot in slots]:
+        raise SystemExit("NextFireTable diverged from the legacy computation")
+
+    print(f"users: {args.users}, zones: {len(zones)}, table entries: {len(table)}")
+    print(f"legacy:      {legacy_seconds:.3f}s ({legacy_seconds / args.users * 1e9:.0f} ns/user)")
+    print(f"table cold:  {table_seconds:.3f}s ({table_seconds / args.users * 1e9:.0f} ns/user)")
+    print(f"table warm:  {warm_seconds:.3f}s ({warm_seconds / args.users * 1e9:.0f} ns/user)")
+    print(f"speedup:     {legacy_seconds / warm_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from collections.abc import Awaitable, Callable, Iterator
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+from zoneinfo import available_timezones
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from bot.db.base import Base
+from bot.repositories.fsm import FsmRepository
+from bot.repositories.stats import StatsRepository
+from bot.repositories.surveys import SurveyRepository
+from bot.repositories.users import UserRepository
+from bot.utils.timezone import SURVEY_TIME
+
+# Все данные живут в отдельной схеме, которая пересоздается на каждом прогоне: рабочие таблицы не затрагиваются.
+SCHEMA = "query_plans"
+# Таблицы, которые растут вместе с командой и историей; последовательный проход по ним считается регрессией.
+LARGE_TABLES = {"users", "surveys", "answers", "daily_user_stats", "fsm_records"}
+REMINDER_OFFSETS = [timedelta(hours=2), timedelta(hours=6), timedelta(hours=12)]
+
+
+@dataclass(slots=True)
+class PlanCase:
+    name: str
+    run: Callable[[AsyncSession], Awaitable[Any]]
+    # Запросы, которым по смыслу нужна вся таблица (полная пересборка rollup, DISTINCT по всем пользователям).
+    full_scan_expected: bool = False
+    # Индексы, которые обязаны встретиться в плане (Index Name или арбитр ON CONFLICT): отсутствие Seq Scan
+    # еще не значит, что запрос идет по своему индексу.
+    indexes: tuple[str, ...] = ()
+    plans: list[dict[str, Any]] = field(default_factory=list)
+
+
+class PlanCapture:
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.active = False
+        self.plans: list[dict[str, Any]] = []
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before, retval=True)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):  # noqa: ANN001, ANN202
+        # Вместо выполнения запрос репозитория уходит в EXPLAIN с теми же параметрами: план строится
+        # для реального SQL, а DML при этом не исполняется.
+        if self.active and not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")):
+            return f"EXPLAIN (FORMAT JSON) {statement}", parameters
+        return statement, parameters
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: ANN001
+        if self.active and statement.startswith("EXPLAIN (FORMAT JSON)"):
+            plan = cursor.fetchone()[0]
+            self.plans.append((json.loads(plan) if isinstance(plan, str) else plan)[0])
+
+
+def iter_nodes(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    stack = [plan["Plan"]]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.get("Plans", []))
+
+
+def iter_scans(plan: dict[str, Any]) -> Iterator[tuple[str, str | None]]:
+    for node in iter_nodes(plan):
+        yield node["Node Type"], node.get("Relation Name")
+
+
+def used_indexes(plan: dict[str, Any]) -> set[str]:
+    used: set[str] = set()
+    for node in iter_nodes(plan):
+        if "Index Name" in node:
+            used.add(node["Index Name"])
+        used.update(node.get("Conflict Arbiter Indexes", []))
+    return used
+
+
+async def seed(engine: AsyncEngine, session_factory: async_sessionmaker, users: int, days: int) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await conn.run_sync(Base.metadata.create_all)
+
+        await conn.execute(
+            text(
+                "INSERT INTO users (user_id, username, timezone, created_at) "
+                "SELECT 1000000 + g, 'user' || g, zones[1 + g % cardinality(zones)], now() "
+                "FROM (SELECT CAST(:zones AS text[]) AS zones) AS z, generate_series(1, :users) AS g"
+            ),
+            {"zones": sorted(available_timezones()), "users": users},
+        )
+        # 95% анкет завершены; у старых незавершенных ступени напоминаний уже пройдены,
+        # поэтому очередь напоминаний, как и в проде, — малая доля таблицы.
+        await conn.execute(
+            text(
+                "INSERT INTO surveys (user_id, date, status, sent_at, completed_at, next_reminder_at) "
+                "SELECT u.id, d.day, s.status::surveystatus, d.day + interval '18 hours', "
+                "       CASE WHEN s.status = 'answered' THEN d.day + interval '19 hours' END, "
+                "       CASE WHEN s.status = 'pending' AND d.day >= current_date - 1 THEN d.day + interval '30 hours' END "
+                "FROM users AS u "
+                "CROSS JOIN LATERAL (SELECT (current_date - g)::date AS day FROM generate_series(1, :days) AS g) AS d "
+                "CROSS JOIN LATERAL (SELECT CASE WHEN random() < 0.95 THEN 'answered' ELSE 'pending' END AS status) AS s"
+            ),
+            {"days": days},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO answers (survey_id, mood, campaigns_count, geo_count, creatives_count, accounts_count) "
+                "SELECT id, (ARRAY['🔴', '🟡', '🟢'])[1 + floor(random() * 3)::int], "
+                "       floor(random() * 30)::int, floor(random() * 6)::int, floor(random() * 5)::int, floor(random() * 6)::int "
+                "FROM surveys WHERE status = 'answered'"
+            )
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO fsm_records (key, state, data, updated_at) "
+                "SELECT 'fsm\\:1\\:' || (1000000 + g) || '\\:' || (1000000 + g) || '\\:default', NULL, '{}'::jsonb, now() "
+                "FROM generate_series(1, :users) AS g"
+            ),
+            {"users": users},
+        )
+
+    async with session_factory() as session:
+        async with session.begin():
+            await StatsRepository(session).backfill()
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE"))
+
+
+async def first_chunk(repo: SurveyRepository, date_from: date, date_to: date) -> None:
+    async for _ in repo.stream_answered_in_range(date_from, date_to):
+        break
+
+
+def build_cases(users: int, user_db_id: int, pending_survey_id: int) -> list[PlanCase]:
+    telegram_user_id = 1_000_000 + users // 2
+    yesterday = date.today() - timedelta(days=1)
+    fsm_key = f"fsm:1:{telegram_user_id}:{telegram_user_id}:default"
+
+    return [
+        PlanCase(
+            "users.get_by_telegram_id",
+            lambda s: UserRepository(s).get_by_telegram_id(telegram_user_id),
+            indexes=("ix_users_user_id",),
+        ),
+        PlanCase(
+            "users.list_by_slots",
+            lambda s: UserRepository(s).list_by_slots([("Asia/Tokyo", SURVEY_TIME)], SURVEY_TIME),
+            indexes=("ix_users_timezone",),
+        ),
+        PlanCase(
+            "users.slot_in_use",
+            lambda s: UserRepository(s).slot_in_use("Asia/Tokyo", SURVEY_TIME, SURVEY_TIME),
+            indexes=("ix_users_timezone",),
+        ),
+        PlanCase("users.list_schedules", lambda s: UserRepository(s).list_schedules(), full_scan_expected=True),
+        PlanCase(
+            "users.delete_by_telegram_id",
+            lambda s: UserRepository(s).delete_by_telegram_id(telegram_user_id),
+            indexes=("ix_users_user_id",),
+        ),
+        PlanCase(
+            "surveys.create_daily_bulk",
+            lambda s: SurveyRepository(s).create_daily_bulk([(user_db_id, yesterday)]),
+            indexes=("uq_survey_user_date",),
+        ),
+        PlanCase(
+            "surveys.complete_pending",
+            lambda s: SurveyRepository(s).complete_pending(pending_survey_id, "🟢", 1, 1, 1, 1),
+            indexes=("surveys_pkey",),
+        ),
+        PlanCase(
+            "surveys.claim_due_reminders",
+            lambda s: SurveyRepository(s).claim_due_reminders(datetime.now(tz=timezone.utc), REMINDER_OFFSETS),
+            indexes=("ix_surveys_next_reminder_at",),
+        ),
+        PlanCase(
+            "surveys.retry_reminders",
+            lambda s: SurveyRepository(s).retry_reminders([pending_survey_id], 0, datetime.now(tz=timezone.utc)),
+            indexes=("surveys_pkey",),
+        ),
+        PlanCase(
+            "surveys.stream_answered_in_range",
+            lambda s: first_chunk(SurveyRepository(s), yesterday, yesterday),
+            indexes=("ix_surveys_answered_date",),
+        ),
+        PlanCase(
+            "stats.stats_by_user_in_range",
+            lambda s: StatsRepository(s).stats_by_user_in_range(yesterday, yesterday),
+            indexes=("ix_daily_user_stats_date",),
+        ),
+        # daily_team_stats — строка на день, таблица не растет с командой: индекс для нее не обязателен.
+        PlanCase("stats.stats_overall_in_range", lambda s: StatsRepository(s).stats_overall_in_range(yesterday, yesterday)),
+        PlanCase(
+            "stats.add_answer",
+            lambda s: StatsRepository(s).add_answer(user_db_id, yesterday, "🟢", 1, 1, 1, 1, 1.0),
+            indexes=("daily_user_stats_pkey", "daily_team_stats_pkey"),
+        ),
+        PlanCase(
+            "stats.subtract_user",
+            lambda s: StatsRepository(s).subtract_user(telegram_user_id),
+            indexes=("ix_users_user_id", "daily_user_stats_pkey"),
+        ),
+        PlanCase("stats.backfill", lambda s: StatsRepository(s).backfill(), full_scan_expected=True),
+        PlanCase("fsm.get", lambda s: FsmRepository(s).get(fsm_key), indexes=("fsm_records_pkey",)),
+        PlanCase("fsm.delete_many", lambda s: FsmRepository(s).delete_many([fsm_key]), indexes=("fsm_records_pkey",)),
+    ]
+
+
+async def run(database_url: str, users: int, days: int, keep: bool) -> bool:
+    engine = create_async_engine(database_url, connect_args={"server_settings": {"search_path": SCHEMA}})
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    seeded = False
+    try:
+        await seed(engine, session_factory, users, days)
+        seeded = True
+
+        async with engine.connect() as conn:
+            user_db_id = await conn.scalar(text("SELECT id FROM users WHERE user_id = :id"), {"id": 1_000_000 + users // 2})
+            pending_survey_id = await conn.scalar(text("SELECT min(id) FROM surveys WHERE status = 'pending'"))
+
+        capture = PlanCapture(engine)
+        ok = True
+        for case in build_cases(users, user_db_id, pending_survey_id):
+            error: DBAPIError | None = None
+            async with session_factory() as session:
+                capture.plans = []
+                capture.active = True
+                try:
+                    await case.run(session)
+                except DBAPIError as exc:
+                    # Ошибка PostgreSQL (в том числе на самом EXPLAIN) — это сломанный запрос, а не шум проверки.
+                    error = exc
+                except Exception:
+                    # Репозиторий получает строки EXPLAIN вместо своих; ошибки разбора результата ожидаемы.
+                    pass
+                finally:
+                    capture.active = False
+                    await session.rollback()
+            case.plans = capture.plans
+
+            scans = [scan for plan in case.plans for scan in iter_scans(plan) if scan[1] is not None]
+            seq_scans = sorted({relation for node, relation in scans if node == "Seq Scan" and relation in LARGE_TABLES})
+            missing = sorted(set(case.indexes) - {name for plan in case.plans for name in used_indexes(plan)})
+            if error is not None:
+                status, ok = "ERROR", False
+            elif not case.plans:
+                status, ok = "NO PLAN", False
+            elif seq_scans and not case.full_scan_expected:
+                status, ok = "FAIL", False
+            elif missing:
+                status, ok = "NO INDEX", False
+            else:
+                status = "ok"
+            described = ", ".join(f"{node} on {relation}" for node, relation in scans) or "-"
+            print(f"{status:8} {case.name:50} {described}")
+            if missing:
+                print(f"         expected index not used: {', '.join(missing)}")
+            if error is not None:
+                print(f"         {error.orig!r}")
+        return ok
+    finally:
+        # Без созданной схемы (например, база недоступна) чистить нечего, а повторная ошибка скрыла бы исходную.
+        if seeded and not keep:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Проверка планов запросов репозиториев на синтетических данных: ни один из них не должен "
+        "последовательно читать большие таблицы."
+    )
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"), help="postgresql+asyncpg://...")
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--keep", action="store_true", help=f"не удалять схему {SCHEMA} после прогона")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+
+    # Код выхода для CI: 1 — найдена регрессия плана или запрос упал, любая другая ошибка (нет доступа к базе,
+    # сбой генерации данных) завершает процесс необработанным исключением, тоже с ненулевым кодом.
+    if not asyncio.run(run(args.database_url, args.users, args.days, args.keep)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
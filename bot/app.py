@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from functools import partial
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.enums import ParseMode
+
+from bot.config.settings import Settings
+from bot.db.schema import ensure_schema_current
+from bot.db.session import create_sync_engine, engine, session_factory
+from bot.domain.reminders import parse_reminder_stages
+from bot.handlers import common, survey
+from bot.scheduler.events import ScheduleEventListener
+from bot.scheduler.jobs import SchedulerService
+from bot.scheduler.leader import LeaderElector
+from bot.services.export_service import ExportService
+from bot.services.message_dispatcher import MessageDispatcher
+from bot.services.report_aggregator import ReportAggregator
+from bot.services.stats_cache import StatsCache
+from bot.services.cache_events import CacheInvalidationListener
+from bot.services.stats_pages import StatsPages
+from bot.services.survey_service import SurveyService
+from bot.services.user_cache import UserCache
+from bot.services.user_service import UserService
+from bot.utils.fsm_storage import PostgresStorage
+from bot.utils.metrics import SEND_QUEUE_DEPTH, SchedulerMetrics, count_statements, instrument_router, serve_metrics
+from bot.utils.timezone import NextFireTable
+
+
+@dataclass(slots=True)
+class Application:
+    bot: Bot
+    dp: Dispatcher
+    message_dispatcher: MessageDispatcher
+    scheduler_service: SchedulerService
+    leader_elector: LeaderElector
+
+
+async def on_startup(
+    message_dispatcher: MessageDispatcher,
+    leader_elector: LeaderElector,
+    cache_events: CacheInvalidationListener | None,
+) -> None:
+    logging.info("Starting up bot...")
+    revision = await ensure_schema_current(engine)
+    logging.info("Database schema ready (revision %s)", revision)
+    message_dispatcher.start()
+    if cache_events is not None:
+        cache_events.start()
+    # Планировщик запускается только в процессе, который выиграл выборы лидера.
+    leader_elector.start()
+
+
+async def on_shutdown(
+    message_dispatcher: MessageDispatcher,
+    report_aggregator: ReportAggregator,
+    leader_elector: LeaderElector,
+    cache_events: CacheInvalidationListener | None,
+    dispatcher: Dispatcher,
+) -> None:
+    logging.info("Shutting down bot...")
+    await leader_elector.stop()
+    if cache_events is not None:
+        await cache_events.stop()
+    # Накопленные сводки отправляются до остановки очереди исходящих сообщений.
+    await report_aggregator.flush()
+    await message_dispatcher.stop()
+    await dispatcher.storage.close()
+    await engine.dispose()
+    logging.info("Shutdown complete")
+
+
+async def on_elected(scheduler_service: SchedulerService, schedule_events: ScheduleEventListener) -> None:
+    scheduler_service.start()
+    schedule_events.start()
+    logging.info("Scheduler started")
+
+
+async def on_demoted(scheduler_service: SchedulerService, schedule_events: ScheduleEventListener) -> None:
+    await schedule_events.stop()
+    scheduler_service.shutdown()
+    logging.info("Scheduler stopped")
+
+
+def setup_logging() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+    )
+
+
+def create_bot(settings: Settings) -> Bot:
+    return Bot(token=settings.bot_token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+
+
+def create_application(settings: Settings, worker_index: int | None = None) -> Application:
+    if settings.metrics_port is not None:
+        # Каждый процесс отдает свои метрики: воркеры слушают следующие за METRICS_PORT порты.
+        serve_metrics(settings.metrics_port + (0 if worker_index is None else worker_index + 1), settings.metrics_host)
+    count_statements(engine)
+
+    bot = create_bot(settings)
+    dp = Dispatcher(storage=PostgresStorage(session_factory))
+    # Лимиты Telegram общие на токен бота: при WORKERS > 1 каждый процесс получает свою долю.
+    message_dispatcher = MessageDispatcher(
+        bot,
+        workers=settings.send_workers,
+        global_rate=settings.send_rate_limit,
+        rate_share=1 / max(settings.workers, 1),
+    )
+    SEND_QUEUE_DEPTH.set_function(lambda: message_dispatcher.queue_depth)
+
+    reminder_stages = parse_reminder_stages(settings.reminder_stages)
+    user_cache = UserCache()
+    stats_cache = StatsCache()
+    # В одном процессе кэши сбрасываются локально; слушатель нужен, только когда данные меняют другие воркеры.
+    cache_events = CacheInvalidationListener(engine, stats_cache, user_cache) if settings.workers > 1 else None
+    # Общая для планировщика и /result таблица ближайших рассылок по таймзонам.
+    fire_table = NextFireTable(settings.default_send_time)
+    user_service = UserService(
+        session_factory=session_factory,
+        user_cache=user_cache,
+        stats_cache=stats_cache,
+        default_send_time=settings.default_send_time,
+    )
+    survey_service = SurveyService(
+        session_factory=session_factory,
+        user_cache=user_cache,
+        stats_cache=stats_cache,
+        admin_id=settings.admin_id,
+        report_chat_id=settings.report_chat_id,
+        fire_table=fire_table,
+        reminder_stages=reminder_stages,
+    )
+    scheduler_service = SchedulerService(
+        dispatcher=message_dispatcher,
+        session_factory=session_factory,
+        admin_id=settings.admin_id,
+        report_chat_id=settings.report_chat_id,
+        overdue_digest=settings.overdue_digest,
+        overdue_batch_size=settings.overdue_batch_size,
+        jobstore_engine=create_sync_engine(),
+        misfire_grace_time=settings.survey_misfire_grace,
+        full_sync_minutes=settings.schedule_full_sync_minutes,
+        fire_table=fire_table,
+        default_send_time=settings.default_send_time,
+        reminder_stages=reminder_stages,
+        reminder_tick_seconds=settings.reminder_tick_seconds,
+    )
+    SchedulerMetrics().attach(scheduler_service.scheduler)
+    schedule_events = ScheduleEventListener(
+        engine,
+        on_event=scheduler_service.apply_schedule_event,
+        on_resync=scheduler_service.sync_deferred_survey_jobs,
+    )
+    leader_elector = LeaderElector(
+        engine,
+        on_elected=partial(on_elected, scheduler_service, schedule_events),
+        on_demoted=partial(on_demoted, scheduler_service, schedule_events),
+    )
+
+    export_service = ExportService(session_factory=session_factory)
+    stats_pages = StatsPages(survey_service)
+
+    common.register(dp, user_service, survey_service, export_service, stats_pages, message_dispatcher, settings.admin_id)
+    report_aggregator = ReportAggregator(
+        message_dispatcher,
+        mode=settings.report_mode,
+        max_reports=settings.report_digest_size,
+        flush_interval=settings.report_digest_interval,
+    )
+    survey.register(dp, survey_service, report_aggregator)
+    instrument_router(dp)
+
+    dp.startup.register(partial(on_startup, message_dispatcher, leader_elector, cache_events))
+    dp.shutdown.register(partial(on_shutdown, message_dispatcher, report_aggregator, leader_elector, cache_events))
+
+    return Application(
+        bot=bot,
+        dp=dp,
+        message_dispatcher=message_dispatcher,
+        scheduler_service=scheduler_service,
+        leader_elector=leader_elector,
+    )
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from datetime import date
+
+from bot.db.schema import ensure_schema_current
+from bot.db.session import engine, session_factory
+from bot.repositories.stats import StatsRepository
+
+
+async def backfill(date_from: date | None, date_to: date | None) -> None:
+    await ensure_schema_current(engine)
+
+    async with session_factory() as session:
+        repo = StatsRepository(session)
+        async with session.begin():
+            rows = await repo.backfill(date_from=date_from, date_to=date_to)
+    logging.info("Daily stats rollup rebuilt: user_days=%s from=%s to=%s", rows, date_from, date_to)
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пересобрать rollup-таблицы статистики из сохраненных ответов.")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, default=None, help="YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, default=None, help="YYYY-MM-DD")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+    )
+    asyncio.run(backfill(args.date_from, args.date_to))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from datetime import date
+from pathlib import Path
+
+from bot.db.session import engine, session_factory
+from bot.services.export_service import EXPORT_FORMATS, ExportService
+
+
+async def export(date_from: date, date_to: date, fmt: str, output: Path, chunk_size: int) -> None:
+    service = ExportService(session_factory=session_factory, chunk_size=chunk_size)
+    try:
+        await service.export(date_from, date_to, fmt, output)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Выгрузить завершенные анкеты с пользователями и скорингом.")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, required=True, help="YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, required=True, help="YYYY-MM-DD")
+    parser.add_argument("--format", dest="fmt", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+    )
+    asyncio.run(export(args.date_from, args.date_to, args.fmt, args.output, args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import argparse
+import logging
+
+from alembic import command
+
+from bot.db.schema import alembic_config
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Применить миграции схемы базы данных.")
+    parser.add_argument("revision", nargs="?", default="head", help="целевая ревизия (по умолчанию head)")
+    parser.add_argument("--sql", action="store_true", help="вывести SQL вместо выполнения")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+    )
+    config = alembic_config()
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, args.revision, sql=args.sql)
+
+
+if __name__ == "__main__":
+    main()
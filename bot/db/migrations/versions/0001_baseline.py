@@ -0,0 +1,128 @@
+"""baseline schema
+
+Базы, созданные раньше через Base.metadata.create_all, подхватываются этой же ревизией:
+таблицы создаются только если их нет, индексы — через IF NOT EXISTS.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0001"
+down_revision: str | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+survey_status = postgresql.ENUM("pending", "answered", name="surveystatus", create_type=False)
+
+STAT_COLUMNS = (
+    ("surveys_count", sa.Integer()),
+    ("mood_sum", sa.Integer()),
+    ("campaigns_sum", sa.Integer()),
+    ("geo_sum", sa.Integer()),
+    ("creatives_sum", sa.Integer()),
+    ("accounts_sum", sa.Integer()),
+    ("score_sum", sa.Float()),
+)
+
+
+INDEXES = (
+    ("ix_users_user_id", "users", ["user_id"], {"unique": True}),
+    ("ix_users_timezone", "users", ["timezone"], {}),
+    ("ix_surveys_user_id", "surveys", ["user_id"], {}),
+    ("ix_surveys_date", "surveys", ["date"], {}),
+    (
+        "ix_surveys_pending_unnotified_sent_at",
+        "surveys",
+        ["sent_at"],
+        {"postgresql_where": sa.text("status = 'pending' AND admin_notified_at IS NULL")},
+    ),
+    ("ix_surveys_answered_date", "surveys", ["date", "id"], {"postgresql_where": sa.text("status = 'answered'")}),
+    ("ix_answers_survey_id", "answers", ["survey_id"], {"unique": True}),
+    ("ix_daily_user_stats_date", "daily_user_stats", ["date"], {}),
+)
+
+
+def _stat_columns() -> list[sa.Column]:
+    return [sa.Column(name, column_type, nullable=False) for name, column_type in STAT_COLUMNS]
+
+
+def upgrade() -> None:
+    if op.get_context().as_sql:
+        existing: set[str] = set()
+        op.execute("CREATE TYPE surveystatus AS ENUM ('pending', 'answered')")
+    else:
+        existing = set(sa.inspect(op.get_bind()).get_table_names())
+        survey_status.create(op.get_bind(), checkfirst=True)
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.BigInteger(), nullable=False),
+            sa.Column("username", sa.String(length=255), nullable=True),
+            sa.Column("timezone", sa.String(length=64), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        )
+    if "surveys" not in existing:
+        op.create_table(
+            "surveys",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("status", survey_status, nullable=False),
+            sa.Column("sent_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("admin_notified_at", sa.DateTime(timezone=True), nullable=True),
+            sa.UniqueConstraint("user_id", "date", name="uq_survey_user_date"),
+        )
+    if "answers" not in existing:
+        op.create_table(
+            "answers",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("survey_id", sa.Integer(), sa.ForeignKey("surveys.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("mood", sa.String(length=16), nullable=False),
+            sa.Column("campaigns_count", sa.Integer(), nullable=False),
+            sa.Column("geo_count", sa.Integer(), nullable=False),
+            sa.Column("creatives_count", sa.Integer(), nullable=False),
+            sa.Column("accounts_count", sa.Integer(), nullable=False),
+        )
+    if "daily_user_stats" not in existing:
+        op.create_table(
+            "daily_user_stats",
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("date", sa.Date(), primary_key=True),
+            *_stat_columns(),
+        )
+    if "daily_team_stats" not in existing:
+        op.create_table(
+            "daily_team_stats",
+            sa.Column("date", sa.Date(), primary_key=True),
+            *_stat_columns(),
+        )
+    if "fsm_records" not in existing:
+        op.create_table(
+            "fsm_records",
+            sa.Column("key", sa.String(length=255), primary_key=True),
+            sa.Column("state", sa.String(length=255), nullable=True),
+            sa.Column("data", postgresql.JSONB(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        )
+
+    # На унаследованной базе таблицы уже наполнены: индексы строятся CONCURRENTLY, без блокировки записи.
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **options)
+
+
+def downgrade() -> None:
+    for table in ("fsm_records", "daily_team_stats", "daily_user_stats", "answers", "surveys", "users"):
+        op.drop_table(table)
+    op.execute("DROP TYPE IF EXISTS surveystatus")
@@ -0,0 +1,28 @@
+"""user send time
+
+Индивидуальное время рассылки; NULL означает время команды по умолчанию.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0003"
+down_revision: str | None = "0002"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # Nullable-колонка без DEFAULT добавляется без перезаписи таблицы.
+    op.add_column("users", sa.Column("send_time", sa.Time(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("users", "send_time")
@@ -0,0 +1,57 @@
+"""survey reminders
+
+Очередь напоминаний по неотвеченным анкетам: reminder_stage и next_reminder_at с partial index.
+Заменяет однократное уведомление админа по ix_surveys_pending_unnotified_sent_at.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0004"
+down_revision: str | None = "0003"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("surveys", sa.Column("reminder_stage", sa.SmallInteger(), server_default=sa.text("0"), nullable=False))
+    op.add_column("surveys", sa.Column("next_reminder_at", sa.DateTime(timezone=True), nullable=True))
+    # Анкеты, которые еще ждали уведомления админа, сразу попадают в очередь: первый проход переведет
+    # каждую на ее последнюю наступившую ступень. Выборка идет по старому partial index и мала.
+    op.execute(
+        "UPDATE surveys SET next_reminder_at = sent_at "
+        "WHERE status = 'pending' AND admin_notified_at IS NULL"
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_surveys_next_reminder_at",
+            "surveys",
+            ["next_reminder_at", "id"],
+            postgresql_where=sa.text("next_reminder_at IS NOT NULL"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index("ix_surveys_pending_unnotified_sent_at", "surveys", postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_surveys_pending_unnotified_sent_at",
+            "surveys",
+            ["sent_at"],
+            postgresql_where=sa.text("status = 'pending' AND admin_notified_at IS NULL"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index("ix_surveys_next_reminder_at", "surveys", postgresql_concurrently=True, if_exists=True)
+    op.drop_column("surveys", "next_reminder_at")
+    op.drop_column("surveys", "reminder_stage")
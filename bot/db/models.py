@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from datetime import date, datetime
+from datetime import date, datetime, time
 from enum import Enum
+from typing import Any
 
-from sqlalchemy import BigInteger, Date, DateTime, Enum as SqlEnum, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy import BigInteger, Date, DateTime, Enum as SqlEnum, Float, ForeignKey, Index, Integer, SmallInteger, String, Time, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from bot.db.base import Base
@@ -20,7 +22,9 @@ class User(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(BigInteger, unique=True, index=True)
     username: Mapped[str | None] = mapped_column(String(255), nullable=True)
-    timezone: Mapped[str] = mapped_column(String(64), default="Europe/Warsaw")
+    timezone: Mapped[str] = mapped_column(String(64), default="Europe/Warsaw", index=True)
+    # NULL — время рассылки команды по умолчанию (DEFAULT_SEND_TIME).
+    send_time: Mapped[time | None] = mapped_column(Time, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
     surveys: Mapped[list[Survey]] = relationship(back_populates="user", cascade="all, delete-orphan")
@@ -28,7 +32,23 @@ class User(Base):
 
 class Survey(Base):
     __tablename__ = "surveys"
-    __table_args__ = (UniqueConstraint("user_id", "date", name="uq_survey_user_date"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "date", name="uq_survey_user_date"),
+        # Очередь напоминаний: в индексе только анкеты с запланированной ступенью.
+        Index(
+            "ix_surveys_next_reminder_at",
+            "next_reminder_at",
+            "id",
+            postgresql_where=text("next_reminder_at IS NOT NULL"),
+        ),
+        # Выгрузки и пересборка статистики читают только завершенные анкеты за диапазон дат.
+        Index(
+            "ix_surveys_answered_date",
+            "date",
+            "id",
+            postgresql_where=text("status = 'answered'"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
@@ -37,6 +57,9 @@ class Survey(Base):
     sent_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
     completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     admin_notified_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Сколько ступеней напоминаний уже пройдено и когда наступает следующая (NULL — больше не напоминать).
+    reminder_stage: Mapped[int] = mapped_column(SmallInteger, default=0, server_default=text("0"))
+    next_reminder_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     user: Mapped[User] = relationship(back_populates="surveys")
     answer: Mapped[Answer | None] = relationship(back_populates="survey", uselist=False, cascade="all, delete-orphan")
@@ -54,3 +77,39 @@ class Answer(Base):
     accounts_count: Mapped[int] = mapped_column(Integer)
 
     survey: Mapped[Survey] = relationship(back_populates="answer")
+
+
+class DailyUserStats(Base):
+    __tablename__ = "daily_user_stats"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    date: Mapped[date] = mapped_column(Date, primary_key=True, index=True)
+    surveys_count: Mapped[int] = mapped_column(Integer, default=0)
+    mood_sum: Mapped[int] = mapped_column(Integer, default=0)
+    campaigns_sum: Mapped[int] = mapped_column(Integer, default=0)
+    geo_sum: Mapped[int] = mapped_column(Integer, default=0)
+    creatives_sum: Mapped[int] = mapped_column(Integer, default=0)
+    accounts_sum: Mapped[int] = mapped_column(Integer, default=0)
+    score_sum: Mapped[float] = mapped_column(Float, default=0.0)
+
+
+class DailyTeamStats(Base):
+    __tablename__ = "daily_team_stats"
+
+    date: Mapped[date] = mapped_column(Date, primary_key=True)
+    surveys_count: Mapped[int] = mapped_column(Integer, default=0)
+    mood_sum: Mapped[int] = mapped_column(Integer, default=0)
+    campaigns_sum: Mapped[int] = mapped_column(Integer, default=0)
+    geo_sum: Mapped[int] = mapped_column(Integer, default=0)
+    creatives_sum: Mapped[int] = mapped_column(Integer, default=0)
+    accounts_sum: Mapped[int] = mapped_column(Integer, default=0)
+    score_sum: Mapped[float] = mapped_column(Float, default=0.0)
+
+
+class FsmRecord(Base):
+    __tablename__ = "fsm_records"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    state: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    data: Mapped[dict[str, Any]] = mapped_column(JSONB, default=dict)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
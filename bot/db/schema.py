@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+def alembic_config() -> Config:
+    return Config(str(ALEMBIC_INI))
+
+
+@lru_cache(maxsize=1)
+def head_revision() -> str | None:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+async def ensure_schema_current(engine: AsyncEngine) -> str | None:
+    # На старте только читаем alembic_version: миграции применяет отдельный шаг bot.cli.migrate.
+    async with engine.connect() as conn:
+        current = await conn.run_sync(lambda sync_conn: MigrationContext.configure(sync_conn).get_current_revision())
+    expected = head_revision()
+    if current != expected:
+        raise SchemaVersionError(
+            f"Database schema revision is {current}, expected {expected}. Run `python -m bot.cli.migrate` first."
+        )
+    return current
@@ -1,3 +1,4 @@
+from sqlalchemy import Engine, create_engine, make_url
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 from bot.config.settings import get_settings
@@ -5,3 +6,9 @@ from bot.config.settings import get_settings
 settings = get_settings()
 engine = create_async_engine(settings.database_url, pool_pre_ping=True)
 session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+
+def create_sync_engine() -> Engine:
+    # APScheduler 3 работает только с синхронным SQLAlchemy: тот же DATABASE_URL, но через psycopg2.
+    url = make_url(settings.database_url).set(drivername="postgresql+psycopg2")
+    return create_engine(url, pool_pre_ping=True, pool_size=2, max_overflow=2)
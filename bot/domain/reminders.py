@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import timedelta
+
+REMINDER_AUDIENCES = ("user", "admin")
+STAGE_RE = re.compile(r"^(\d+)([mh]):(user|admin)$")
+
+
+@dataclass(frozen=True, slots=True)
+class ReminderStage:
+    # Задержка считается от отправки анкеты (sent_at), а не от предыдущей ступени.
+    after: timedelta
+    audience: str
+
+    @property
+    def label(self) -> str:
+        minutes = int(self.after.total_seconds() // 60)
+        if minutes % 60 == 0:
+            return _plural(minutes // 60, "часа", "часов")
+        return _plural(minutes, "минуты", "минут")
+
+
+def parse_reminder_stages(value: str) -> tuple[ReminderStage, ...]:
+    # Формат: "2h:user,6h:user,12h:admin"; пустая строка отключает напоминания.
+    stages: list[ReminderStage] = []
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        match = STAGE_RE.fullmatch(item)
+        if match is None:
+            raise ValueError(f"Invalid reminder stage: {item}")
+        amount, unit, audience = int(match.group(1)), match.group(2), match.group(3)
+        after = timedelta(hours=amount) if unit == "h" else timedelta(minutes=amount)
+        if stages and after <= stages[-1].after:
+            raise ValueError("Reminder stages must be strictly increasing")
+        stages.append(ReminderStage(after=after, audience=audience))
+    return tuple(stages)
+
+
+def first_reminder_after(stages: tuple[ReminderStage, ...]) -> timedelta | None:
+    return stages[0].after if stages else None
+
+
+def _plural(amount: int, one: str, many: str) -> str:
+    # После "более": 1 часа, 2 часов, 21 часа, 11 часов.
+    return f"{amount} {one if amount % 10 == 1 and amount % 100 != 11 else many}"
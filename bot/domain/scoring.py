@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+from bisect import bisect_right
 from dataclasses import dataclass
 
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
 
 @dataclass(slots=True)
 class ScoreResult:
@@ -15,28 +19,42 @@ class ScoreResult:
     message: str
 
 
+@dataclass(slots=True)
+class BatchScoreResult:
+    # Коды цветов: индекс в ScoringEngine.COLORS, он же вес (0 — 🔴, 1 — 🟡, 2 — 🟢).
+    campaigns_code: NDArray[np.int8]
+    geo_code: NDArray[np.int8]
+    creatives_code: NDArray[np.int8]
+    accounts_code: NDArray[np.int8]
+    average: NDArray[np.float64]
+    final_code: NDArray[np.int8]
+
+
 class ScoringEngine:
-    WEIGHTS = {"🟢": 2, "🟡": 1, "🔴": 0}
+    COLORS = ("🔴", "🟡", "🟢")
+    WEIGHTS = {color: weight for weight, color in enumerate(COLORS)}
+    METRICS = ("campaigns", "geo", "creatives", "accounts")
+    # Пороги метрик: (минимум для 🟡, минимум для 🟢).
+    THRESHOLDS = {
+        "campaigns": (10, 20),
+        "geo": (2, 4),
+        "creatives": (1, 3),
+        "accounts": (2, 4),
+    }
+    # Пороги итоговой средней по метрикам: (минимум для 🟡, минимум для 🟢).
+    FINAL_THRESHOLDS = (0.75, 1.5)
+    FINAL_MESSAGES = ("ты в зоне риска.", "сегодня передышка ?", "молодец - так держать")
 
     def score(self, mood: str, campaigns: int, geo: int, creatives: int, accounts: int) -> ScoreResult:
-        campaigns_color = "🟢" if campaigns >= 20 else "🟡" if campaigns >= 10 else "🔴"
-        geo_color = "🟢" if geo >= 4 else "🟡" if geo >= 2 else "🔴"
-        creatives_color = "🟢" if creatives >= 3 else "🟡" if creatives >= 1 else "🔴"
-        accounts_color = "🟢" if accounts >= 4 else "🟡" if accounts >= 2 else "🔴"
+        campaigns_color = self.metric_color("campaigns", campaigns)
+        geo_color = self.metric_color("geo", geo)
+        creatives_color = self.metric_color("creatives", creatives)
+        accounts_color = self.metric_color("accounts", accounts)
 
         # Настроение считается отдельной метрикой и не влияет на итоговую эффективность.
         performance_colors = [campaigns_color, geo_color, creatives_color, accounts_color]
         average = sum(self.WEIGHTS[color] for color in performance_colors) / len(performance_colors)
-
-        if average >= 1.5:
-            final_color = "🟢"
-            message = "молодец - так держать"
-        elif average >= 0.75:
-            final_color = "🟡"
-            message = "сегодня передышка ?"
-        else:
-            final_color = "🔴"
-            message = "ты в зоне риска."
+        final_code = bisect_right(self.FINAL_THRESHOLDS, average)
 
         return ScoreResult(
             mood_color=mood,
@@ -45,6 +63,45 @@ class ScoringEngine:
             creatives_color=creatives_color,
             accounts_color=accounts_color,
             average=average,
-            final_color=final_color,
-            message=message,
+            final_color=self.COLORS[final_code],
+            message=self.FINAL_MESSAGES[final_code],
+        )
+
+    def score_batch(
+        self,
+        campaigns: ArrayLike,
+        geo: ArrayLike,
+        creatives: ArrayLike,
+        accounts: ArrayLike,
+    ) -> BatchScoreResult:
+        codes = {
+            metric: self.metric_codes(metric, values)
+            for metric, values in zip(self.METRICS, (campaigns, geo, creatives, accounts))
+        }
+        total = np.zeros(len(codes["campaigns"]), dtype=np.float64)
+        for metric_codes in codes.values():
+            total += metric_codes
+        average = total / len(self.METRICS)
+        final_code = np.searchsorted(np.asarray(self.FINAL_THRESHOLDS), average, side="right").astype(np.int8)
+
+        return BatchScoreResult(
+            campaigns_code=codes["campaigns"],
+            geo_code=codes["geo"],
+            creatives_code=codes["creatives"],
+            accounts_code=codes["accounts"],
+            average=average,
+            final_code=final_code,
         )
+
+    @classmethod
+    def metric_color(cls, metric: str, value: int) -> str:
+        return cls.COLORS[bisect_right(cls.THRESHOLDS[metric], value)]
+
+    @classmethod
+    def metric_codes(cls, metric: str, values: ArrayLike) -> NDArray[np.int8]:
+        thresholds = np.asarray(cls.THRESHOLDS[metric])
+        return np.searchsorted(thresholds, np.asarray(values), side="right").astype(np.int8)
+
+    @classmethod
+    def colors(cls, codes: ArrayLike) -> list[str]:
+        return np.asarray(cls.COLORS, dtype=object)[np.asarray(codes)].tolist()
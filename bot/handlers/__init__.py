@@ -0,0 +1,3 @@
+# Типы апдейтов, на которые подписаны хендлеры. Супервизору при WORKERS > 1 они нужны без сборки
+# всего приложения; при новом типе хендлера (inline_query и т.п.) список надо дополнить.
+ALLOWED_UPDATES = ["message", "callback_query"]
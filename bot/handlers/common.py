@@ -1,39 +1,62 @@
 from __future__ import annotations
 
-from aiogram import Dispatcher, Router
+import tempfile
+from datetime import date
+from pathlib import Path
+
+from aiogram import Dispatcher, F, Router
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command, CommandObject
-from aiogram.types import Message
+from aiogram.methods import EditMessageText, SendDocument
+from aiogram.types import CallbackQuery, FSInputFile, Message
 
+from bot.keyboards.stats import stats_pages_keyboard
 from bot.keyboards.survey import mood_keyboard
-from bot.services.survey_service import StatsEntry, SurveyService
+from bot.services.export_service import EXPORT_FORMATS, ExportService
+from bot.services.message_dispatcher import MessageDispatcher
+from bot.services.stats_pages import StatsPages
+from bot.services.survey_service import SurveyService
 from bot.services.user_service import UserService
-
-
-def _format_stats_entry(entry: StatsEntry) -> str:
-    return (
-        f"👤 <b>@{entry.username}</b> (<code>{entry.user_id}</code>)\n"
-        f"• Анкет: <b>{entry.surveys_count}</b>\n"
-        f"• Настроение (avg): <b>{entry.mood_avg:.2f}</b>\n"
-        f"• Компании (avg): <b>{entry.campaigns_avg:.2f}</b>\n"
-        f"• Гео (avg): <b>{entry.geo_avg:.2f}</b>\n"
-        f"• Крео (avg): <b>{entry.creatives_avg:.2f}</b>\n"
-        f"• Кабинеты (avg): <b>{entry.accounts_avg:.2f}</b>\n"
-        f"• Эффективность (avg): <b>{entry.score_avg:.2f}</b>"
-    )
-
-
-def register(dp: Dispatcher, user_service: UserService, survey_service: SurveyService, admin_id: int) -> None:
+from bot.utils.periods import PERIOD_DAYS, period_range
+
+# Лимит Telegram Bot API на отправку документа ботом.
+TELEGRAM_DOCUMENT_LIMIT = 50 * 1024 * 1024
+
+
+def _parse_export_range(args: list[str]) -> tuple[date, date]:
+    if not args:
+        return period_range("day")
+    if len(args) == 1 and args[0] in PERIOD_DAYS:
+        return period_range(args[0])
+    if len(args) == 2:
+        date_from, date_to = date.fromisoformat(args[0]), date.fromisoformat(args[1])
+        if date_from <= date_to:
+            return date_from, date_to
+    raise ValueError("Invalid export range")
+
+
+def register(
+    dp: Dispatcher,
+    user_service: UserService,
+    survey_service: SurveyService,
+    export_service: ExportService,
+    stats_pages: StatsPages,
+    message_dispatcher: MessageDispatcher,
+    admin_id: int,
+) -> None:
     router = Router()
 
     @router.message(Command("start"))
     async def start_handler(message: Message) -> None:
         if message.from_user is None:
             return
-        await user_service.register(message.from_user.id, message.from_user.username)
+        user = await user_service.register(message.from_user.id, message.from_user.username)
+        send_time = user_service.effective_send_time(user)
         await message.answer(
             "Привет! Я бот ежедневного опроса.\n"
-            "Каждый день в 20:00 по вашему часовому поясу я пришлю опрос.\n"
+            f"Каждый день в {send_time:%H:%M} по вашему часовому поясу я пришлю опрос.\n"
             "Установить таймзону: /timezone Europe/Warsaw или /timezone +1\n"
+            "Изменить время опроса: /sendtime 18:30\n"
             "Запустить опрос сейчас: /result\n"
             "Проверка бота: /test"
         )
@@ -60,6 +83,25 @@ def register(dp: Dispatcher, user_service: UserService, survey_service: SurveySe
             return
         await message.answer(f"Таймзона обновлена: <b>{normalized_timezone}</b>")
 
+    @router.message(Command("sendtime"))
+    async def send_time_handler(message: Message, command: CommandObject) -> None:
+        if message.from_user is None:
+            return
+        value = (command.args or "").strip()
+        if not value:
+            await message.answer(
+                "Укажите время опроса. Примеры:\n"
+                "• /sendtime 18:30\n"
+                "• /sendtime default — время команды по умолчанию"
+            )
+            return
+        await user_service.register(message.from_user.id, message.from_user.username)
+        send_time = await user_service.set_send_time(message.from_user.id, value)
+        if send_time is None:
+            await message.answer("Некорректное время. Используйте формат ЧЧ:ММ с шагом 15 минут, например 18:30")
+            return
+        await message.answer(f"Время опроса обновлено: <b>{send_time:%H:%M}</b>")
+
     @router.message(Command("result"))
     async def result_handler(message: Message) -> None:
         if message.from_user is None:
@@ -93,39 +135,87 @@ def register(dp: Dispatcher, user_service: UserService, survey_service: SurveySe
             return
 
         period = (command.args or "day").strip().lower()
-        if period not in {"day", "week", "month"}:
+        if period not in PERIOD_DAYS:
             await message.answer("Использование: /stats [day|week|month]")
             return
 
-        report = await survey_service.collect_stats(period)
-        if not report.per_user:
-            await message.answer(
-                f"📈 Статистика за <b>{period}</b> ({report.date_from} — {report.date_to})\n\n"
-                "Нет завершенных анкет за выбранный период."
+        pages = await stats_pages.get(period)
+        await message_dispatcher.send_message(
+            message.chat.id,
+            pages[0],
+            reply_markup=stats_pages_keyboard(period, 0, len(pages)),
+        )
+
+    @router.callback_query(F.data.startswith("stats:"))
+    async def stats_page_selected(callback: CallbackQuery) -> None:
+        if callback.data is None or callback.message is None:
+            return
+        if callback.from_user.id != admin_id:
+            await callback.answer("Доступно только администратору.")
+            return
+
+        _, period, page_raw = callback.data.split(":", maxsplit=2)
+        if period not in PERIOD_DAYS or not page_raw.isdigit():
+            await callback.answer()
+            return
+
+        pages = await stats_pages.get(period)
+        page = min(int(page_raw), len(pages) - 1)
+        try:
+            await message_dispatcher.execute(
+                EditMessageText(
+                    chat_id=callback.message.chat.id,
+                    message_id=callback.message.message_id,
+                    text=pages[page],
+                    reply_markup=stats_pages_keyboard(period, page, len(pages)),
+                )
             )
+        except TelegramBadRequest as exc:
+            # Повторное нажатие на текущую страницу: Telegram отвечает "message is not modified".
+            if "message is not modified" not in exc.message:
+                raise
+        await callback.answer()
+
+    @router.message(Command("export"))
+    async def export_handler(message: Message, command: CommandObject) -> None:
+        if message.from_user is None:
+            return
+        if message.from_user.id != admin_id:
+            await message.answer("Команда /export доступна только администратору.")
             return
 
-        blocks = [
-            f"📈 <b>Статистика за {period}</b>\n"
-            f"Период: <b>{report.date_from}</b> — <b>{report.date_to}</b>\n"
-        ]
-        for entry in report.per_user:
-            blocks.append(_format_stats_entry(entry))
-
-        if report.overall is not None:
-            overall = report.overall
-            blocks.append(
-                "🌐 <b>Общая статистика</b>\n"
-                f"• Анкет: <b>{overall.surveys_count}</b>\n"
-                f"• Настроение (avg): <b>{overall.mood_avg:.2f}</b>\n"
-                f"• Компании (avg): <b>{overall.campaigns_avg:.2f}</b>\n"
-                f"• Гео (avg): <b>{overall.geo_avg:.2f}</b>\n"
-                f"• Крео (avg): <b>{overall.creatives_avg:.2f}</b>\n"
-                f"• Кабинеты (avg): <b>{overall.accounts_avg:.2f}</b>\n"
-                f"• Эффективность (avg): <b>{overall.score_avg:.2f}</b>"
+        args = (command.args or "").lower().split()
+        fmt = args.pop() if args and args[-1] in EXPORT_FORMATS else "csv"
+        try:
+            date_from, date_to = _parse_export_range(args)
+        except ValueError:
+            await message.answer(
+                "Использование:\n"
+                "• /export [day|week|month] [csv|parquet]\n"
+                "• /export 2024-01-01 2024-01-31 [csv|parquet]"
             )
+            return
 
-        await message.answer("\n\n".join(blocks))
+        await message.answer(f"Готовлю выгрузку за {date_from} — {date_to} ({fmt})...")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / f"surveys_{date_from}_{date_to}.{fmt}"
+            rows = await export_service.export(date_from, date_to, fmt, path)
+            if rows == 0:
+                await message.answer("Нет завершенных анкет за выбранный период.")
+                return
+            if path.stat().st_size > TELEGRAM_DOCUMENT_LIMIT:
+                await message.answer(
+                    "Файл больше 50 МБ и не может быть отправлен в Telegram. "
+                    "Используйте parquet, период короче или <code>python -m bot.cli.export</code>."
+                )
+                return
+            await message_dispatcher.execute(
+                SendDocument(
+                    chat_id=message.chat.id,
+                    document=FSInputFile(path),
+                    caption=f"📦 Анкет: <b>{rows}</b>, период <b>{date_from}</b> — <b>{date_to}</b>",
+                )
+            )
 
     @router.message(Command("remove_user"))
     async def remove_user_handler(message: Message, command: CommandObject) -> None:
@@ -5,6 +5,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
 from bot.keyboards.survey import confirm_keyboard, mode_keyboard
+from bot.services.report_aggregator import ReportAggregator
 from bot.services.survey_service import SurveyService
 from bot.utils.states import SurveyState
 
@@ -22,7 +23,7 @@ def _draft_text(data: dict[str, object]) -> str:
     )
 
 
-def register(dp: Dispatcher, survey_service: SurveyService) -> None:
+def register(dp: Dispatcher, survey_service: SurveyService, report_aggregator: ReportAggregator) -> None:
     router = Router()
 
     @router.callback_query(F.data.startswith("mood:"))
@@ -171,42 +172,35 @@ def register(dp: Dispatcher, survey_service: SurveyService) -> None:
             await callback.answer()
             return
 
-        full = await survey_service.get_full_survey(int(survey_id))
-        if full is None or full.answer is None:
-            await callback.message.answer("Ошибка получения результатов.")
-            await callback.answer()
-            return
-
         score = result.score
         await callback.message.answer(
             "<b>Опрос завершен!</b>\n\n"
-            f"Настроение: <b>{full.answer.mood}</b>\n"
+            f"Настроение: <b>{result.mood}</b>\n"
             f"Режим: <b>{data['mode']}</b>\n"
-            f"Компании: <b>{full.answer.campaigns_count}</b>\n"
-            f"Гео: <b>{full.answer.geo_count}</b>\n"
-            f"Крео: <b>{full.answer.creatives_count}</b>\n"
-            f"Кабинеты: <b>{full.answer.accounts_count}</b>\n\n"
+            f"Компании: <b>{result.campaigns}</b>\n"
+            f"Гео: <b>{result.geo}</b>\n"
+            f"Крео: <b>{result.creatives}</b>\n"
+            f"Кабинеты: <b>{result.accounts}</b>\n\n"
             f"Итог: <b>{score.final_color} ({score.average:.2f})</b>\n"
             f"{score.message}"
         )
 
         report_text = (
             "<b>📊 Daily Survey Report</b>\n"
-            f"🗓 Дата: <b>{full.date.isoformat()}</b>\n"
-            f"👤 Пользователь: <b>@{full.user.username if full.user and full.user.username else '-'}</b>\n"
-            f"🆔 user_id: <code>{full.user.user_id if full.user else '-'}</code>\n\n"
+            f"🗓 Дата: <b>{result.survey_date.isoformat()}</b>\n"
+            f"👤 Пользователь: <b>@{result.username or '-'}</b>\n"
+            f"🆔 user_id: <code>{result.telegram_user_id}</code>\n\n"
             "<b>Ответы</b>\n"
-            f"• Настроение: {full.answer.mood}\n"
+            f"• Настроение: {result.mood}\n"
             f"• Режим: {data['mode']}\n"
-            f"• Компании: {full.answer.campaigns_count} → {score.campaigns_color}\n"
-            f"• Гео: {full.answer.geo_count} → {score.geo_color}\n"
-            f"• Крео: {full.answer.creatives_count} → {score.creatives_color}\n"
-            f"• Кабинеты: {full.answer.accounts_count} → {score.accounts_color}\n\n"
+            f"• Компании: {result.campaigns} → {score.campaigns_color}\n"
+            f"• Гео: {result.geo} → {score.geo_color}\n"
+            f"• Крео: {result.creatives} → {score.creatives_color}\n"
+            f"• Кабинеты: {result.accounts} → {score.accounts_color}\n\n"
             f"<b>Итог:</b> {score.final_color} <b>({score.average:.2f})</b>\n"
             f"💬 {score.message}"
         )
-        for target in survey_service.report_targets:
-            await callback.message.bot.send_message(chat_id=target, text=report_text)
+        report_aggregator.submit(report_text, survey_service.report_targets)
 
         await callback.answer("Анкета отправлена")
 
@@ -0,0 +1,17 @@
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+
+def stats_pages_keyboard(period: str, page: int, total: int) -> InlineKeyboardMarkup | None:
+    if total <= 1:
+        return None
+    previous_page = (page - 1) % total
+    next_page = (page + 1) % total
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text="◀️", callback_data=f"stats:{period}:{previous_page}"),
+                InlineKeyboardButton(text=f"{page + 1}/{total}", callback_data=f"stats:{period}:{page}"),
+                InlineKeyboardButton(text="▶️", callback_data=f"stats:{period}:{next_page}"),
+            ]
+        ]
+    )
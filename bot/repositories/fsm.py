@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.db.models import FsmRecord
+from bot.utils.metrics import instrument_repository
+
+
+@instrument_repository
+class FsmRepository:
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def get(self, key: str) -> FsmRecord | None:
+        return await self.session.get(FsmRecord, key)
+
+    async def upsert_many(self, records: dict[str, tuple[str | None, dict[str, Any]]]) -> None:
+        if not records:
+            return
+        now = datetime.utcnow()
+        stmt = insert(FsmRecord).values(
+            [{"key": key, "state": state, "data": data, "updated_at": now} for key, (state, data) in records.items()]
+        )
+        await self.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[FsmRecord.key],
+                set_={"state": stmt.excluded.state, "data": stmt.excluded.data, "updated_at": stmt.excluded.updated_at},
+            )
+        )
+
+    async def delete_many(self, keys: list[str]) -> None:
+        if keys:
+            await self.session.execute(delete(FsmRecord).where(FsmRecord.key.in_(keys)))
+
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any
+
+from sqlalchemy import Row, and_, case, delete, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.db.models import Answer, DailyTeamStats, DailyUserStats, Survey, SurveyStatus, User
+from bot.domain.scoring import ScoringEngine
+from bot.utils.metrics import instrument_repository
+
+# Канал сброса кэша отчетов в других процессах; пустой payload — сбросить все даты.
+STATS_CHANNEL = "stats_invalidate"
+
+SUM_FIELDS = ("surveys_count", "mood_sum", "campaigns_sum", "geo_sum", "creatives_sum", "accounts_sum", "score_sum")
+
+
+def _metric_weight(metric: str, column: Any) -> Any:
+    yellow, green = ScoringEngine.THRESHOLDS[metric]
+    weights = ScoringEngine.WEIGHTS
+    return case((column >= green, weights["🟢"]), (column >= yellow, weights["🟡"]), else_=weights["🔴"])
+
+
+def _answer_sums() -> list[Any]:
+    # Те же формулы, что в ScoringEngine.score, но посчитанные агрегатами в PostgreSQL.
+    mood_weight = case(
+        *((Answer.mood == mood, weight) for mood, weight in ScoringEngine.WEIGHTS.items()),
+        else_=0,
+    )
+    score = (
+        _metric_weight("campaigns", Answer.campaigns_count)
+        + _metric_weight("geo", Answer.geo_count)
+        + _metric_weight("creatives", Answer.creatives_count)
+        + _metric_weight("accounts", Answer.accounts_count)
+    ) / literal(4.0)
+    return [
+        func.count(Answer.id).label("surveys_count"),
+        func.sum(mood_weight).label("mood_sum"),
+        func.sum(Answer.campaigns_count).label("campaigns_sum"),
+        func.sum(Answer.geo_count).label("geo_sum"),
+        func.sum(Answer.creatives_count).label("creatives_sum"),
+        func.sum(Answer.accounts_count).label("accounts_sum"),
+        func.sum(score).label("score_sum"),
+    ]
+
+
+def _rollup_sums(model: type[DailyUserStats] | type[DailyTeamStats]) -> list[Any]:
+    return [func.coalesce(func.sum(getattr(model, field)), 0).label(field) for field in SUM_FIELDS]
+
+
+@instrument_repository
+class StatsRepository:
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def notify_invalidate(self, day: date | None = None) -> None:
+        # Как и события расписания, доставляется только после коммита транзакции.
+        await self.session.execute(select(func.pg_notify(STATS_CHANNEL, "" if day is None else day.isoformat())))
+
+    async def add_answer(
+        self,
+        user_db_id: int,
+        survey_date: date,
+        mood: str,
+        campaigns_count: int,
+        geo_count: int,
+        creatives_count: int,
+        accounts_count: int,
+        score_average: float,
+    ) -> None:
+        values = {
+            "surveys_count": 1,
+            "mood_sum": ScoringEngine.WEIGHTS.get(mood, 0),
+            "campaigns_sum": campaigns_count,
+            "geo_sum": geo_count,
+            "creatives_sum": creatives_count,
+            "accounts_sum": accounts_count,
+            "score_sum": score_average,
+        }
+        for model, key in ((DailyUserStats, {"user_id": user_db_id, "date": survey_date}), (DailyTeamStats, {"date": survey_date})):
+            stmt = insert(model).values(**key, **values)
+            await self.session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=list(key),
+                    set_={field: getattr(model, field) + getattr(stmt.excluded, field) for field in SUM_FIELDS},
+                )
+            )
+
+    async def subtract_user(self, telegram_user_id: int) -> None:
+        # Перед удалением пользователя убираем его вклад из командного rollup, иначе общая статистика разойдется с per-user.
+        await self.session.execute(
+            update(DailyTeamStats)
+            .where(
+                and_(
+                    DailyTeamStats.date == DailyUserStats.date,
+                    DailyUserStats.user_id == User.id,
+                    User.user_id == telegram_user_id,
+                )
+            )
+            .values({field: getattr(DailyTeamStats, field) - getattr(DailyUserStats, field) for field in SUM_FIELDS})
+        )
+
+    async def backfill(self, date_from: date | None = None, date_to: date | None = None) -> int:
+        conditions = [Survey.status == SurveyStatus.answered]
+        if date_from is not None:
+            conditions.append(Survey.date >= date_from)
+        if date_to is not None:
+            conditions.append(Survey.date <= date_to)
+
+        for model in (DailyUserStats, DailyTeamStats):
+            stale = delete(model)
+            if date_from is not None:
+                stale = stale.where(model.date >= date_from)
+            if date_to is not None:
+                stale = stale.where(model.date <= date_to)
+            await self.session.execute(stale)
+
+        user_rows = (
+            select(Survey.user_id, Survey.date, *_answer_sums())
+            .select_from(Survey)
+            .join(Answer, Answer.survey_id == Survey.id)
+            .where(and_(*conditions))
+            .group_by(Survey.user_id, Survey.date)
+        )
+        result = await self.session.execute(
+            insert(DailyUserStats).from_select(["user_id", "date", *SUM_FIELDS], user_rows)
+        )
+
+        team_rows = select(DailyUserStats.date, *_rollup_sums(DailyUserStats)).group_by(DailyUserStats.date)
+        if date_from is not None:
+            team_rows = team_rows.where(DailyUserStats.date >= date_from)
+        if date_to is not None:
+            team_rows = team_rows.where(DailyUserStats.date <= date_to)
+        await self.session.execute(insert(DailyTeamStats).from_select(["date", *SUM_FIELDS], team_rows))
+        return result.rowcount
+
+    async def stats_by_user_in_range(self, date_from: date, date_to: date) -> list[Row[Any]]:
+        result = await self.session.execute(
+            select(User.user_id, User.username, *_rollup_sums(DailyUserStats))
+            .select_from(DailyUserStats)
+            .join(User, User.id == DailyUserStats.user_id)
+            .where(and_(DailyUserStats.date >= date_from, DailyUserStats.date <= date_to))
+            .group_by(User.id, User.user_id, User.username)
+            .having(func.sum(DailyUserStats.surveys_count) > 0)
+            .order_by(User.user_id)
+        )
+        return list(result.all())
+
+    async def stats_overall_in_range(self, date_from: date, date_to: date) -> Row[Any]:
+        result = await self.session.execute(
+            select(*_rollup_sums(DailyTeamStats)).where(
+                and_(DailyTeamStats.date >= date_from, DailyTeamStats.date <= date_to)
+            )
+        )
+        return result.one()
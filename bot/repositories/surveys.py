@@ -1,96 +1,193 @@
 from __future__ import annotations
 
+from collections.abc import AsyncIterator, Sequence
 from datetime import date, datetime, timedelta
+from typing import Any
 
-from sqlalchemy import and_, select
+from sqlalchemy import Integer, Interval, Row, String, and_, case, func, literal, select, tuple_, update
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from bot.db.models import Answer, Survey, SurveyStatus
+from bot.db.models import Answer, Survey, SurveyStatus, User
+from bot.utils.metrics import instrument_repository
 
+# Держим multi-row INSERT заметно ниже лимита asyncpg в 32767 параметров.
+BULK_CHUNK_SIZE = 1000
 
+
+@instrument_repository
 class SurveyRepository:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
-    async def create_daily_if_absent(self, user_db_id: int, survey_date: date) -> tuple[Survey, bool]:
-        stmt = (
-            insert(Survey)
-            .values(user_id=user_db_id, date=survey_date)
-            .on_conflict_do_nothing(index_elements=[Survey.user_id, Survey.date])
-            .returning(Survey.id)
-        )
-        inserted_id = await self.session.scalar(stmt)
-        if inserted_id is not None:
-            created = await self.session.get(Survey, inserted_id)
-            if created is None:
-                raise RuntimeError("Inserted survey was not found")
-            return created, True
+    async def create_daily_if_absent(
+        self,
+        user_db_id: int,
+        survey_date: date,
+        first_reminder_after: timedelta | None = None,
+    ) -> tuple[Survey, bool]:
+        surveys = await self.create_daily_bulk([(user_db_id, survey_date)], first_reminder_after)
+        return surveys[(user_db_id, survey_date)]
 
-        existing = await self.get_by_user_and_date(user_db_id, survey_date)
-        if existing is None:
-            raise RuntimeError("Survey conflict detected but existing row was not found")
-        return existing, False
+    async def create_daily_bulk(
+        self,
+        pairs: Sequence[tuple[int, date]],
+        first_reminder_after: timedelta | None = None,
+    ) -> dict[tuple[int, date], tuple[Survey, bool]]:
+        unique_pairs = list(dict.fromkeys(pairs))
+        surveys: dict[tuple[int, date], tuple[Survey, bool]] = {}
+        sent_at = datetime.utcnow()
+        # Новая анкета сразу встает в очередь напоминаний на момент первой ступени.
+        next_reminder_at = sent_at + first_reminder_after if first_reminder_after is not None else None
 
-    async def get_by_user_and_date(self, user_db_id: int, survey_date: date) -> Survey | None:
-        result = await self.session.execute(
-            select(Survey).where(and_(Survey.user_id == user_db_id, Survey.date == survey_date))
-        )
-        return result.scalar_one_or_none()
+        for offset in range(0, len(unique_pairs), BULK_CHUNK_SIZE):
+            chunk = unique_pairs[offset : offset + BULK_CHUNK_SIZE]
+            stmt = (
+                insert(Survey)
+                .values(
+                    [
+                        {"user_id": user_db_id, "date": survey_date, "sent_at": sent_at, "next_reminder_at": next_reminder_at}
+                        for user_db_id, survey_date in chunk
+                    ]
+                )
+                .on_conflict_do_nothing(index_elements=[Survey.user_id, Survey.date])
+                .returning(Survey)
+            )
+            for survey in await self.session.scalars(stmt):
+                surveys[(survey.user_id, survey.date)] = (survey, True)
 
-    async def get_pending_by_id(self, survey_id: int) -> Survey | None:
-        result = await self.session.execute(
-            select(Survey)
-            .options(selectinload(Survey.user), selectinload(Survey.answer))
-            .where(and_(Survey.id == survey_id, Survey.status == SurveyStatus.pending))
-        )
-        return result.scalar_one_or_none()
+            conflicts = [pair for pair in chunk if pair not in surveys]
+            if conflicts:
+                existing = await self.session.scalars(
+                    select(Survey).where(tuple_(Survey.user_id, Survey.date).in_(conflicts))
+                )
+                for survey in existing:
+                    surveys[(survey.user_id, survey.date)] = (survey, False)
+
+        if len(surveys) != len(unique_pairs):
+            raise RuntimeError("Survey conflict detected but existing row was not found")
+        return surveys
 
-    async def save_answer(
+    async def complete_pending(
         self,
-        survey: Survey,
+        survey_id: int,
         mood: str,
         campaigns_count: int,
         geo_count: int,
         creatives_count: int,
         accounts_count: int,
-    ) -> Survey:
-        survey.answer = Answer(
-            mood=mood,
-            campaigns_count=campaigns_count,
-            geo_count=geo_count,
-            creatives_count=creatives_count,
-            accounts_count=accounts_count,
+    ) -> Row[Any] | None:
+        # Один запрос: UPDATE статуса (повторный submit не пройдет), INSERT ответа
+        # и данные пользователя для отчета через data-modifying CTE.
+        completed = (
+            update(Survey)
+            .where(and_(Survey.id == survey_id, Survey.status == SurveyStatus.pending))
+            .values(status=SurveyStatus.answered, completed_at=datetime.utcnow(), next_reminder_at=None)
+            .returning(Survey.id, Survey.user_id, Survey.date, Survey.completed_at)
+            .cte("completed")
+        )
+        answer = (
+            insert(Answer)
+            .from_select(
+                ["survey_id", "mood", "campaigns_count", "geo_count", "creatives_count", "accounts_count"],
+                select(
+                    completed.c.id,
+                    literal(mood, String),
+                    literal(campaigns_count, Integer),
+                    literal(geo_count, Integer),
+                    literal(creatives_count, Integer),
+                    literal(accounts_count, Integer),
+                ),
+            )
+            .cte("answer")
         )
-        survey.status = SurveyStatus.answered
-        survey.completed_at = datetime.utcnow()
-        await self.session.flush()
-        return survey
-
-    async def pending_overdue_without_admin_notification(self) -> list[Survey]:
-        border = datetime.utcnow() - timedelta(hours=12)
         result = await self.session.execute(
-            select(Survey)
-            .options(selectinload(Survey.user))
+            select(completed, User.user_id.label("telegram_user_id"), User.username)
+            .join(User, User.id == completed.c.user_id)
+            .add_cte(answer)
+        )
+        return result.one_or_none()
+
+    async def claim_due_reminders(
+        self,
+        now: datetime,
+        stage_offsets: Sequence[timedelta],
+        limit: int = 500,
+    ) -> list[Row[Any]]:
+        # Берет из очереди (partial index по next_reminder_at) анкеты, у которых наступила очередная ступень,
+        # и одним запросом переводит их на последнюю наступившую ступень: после простоя промежуточные
+        # напоминания не рассылаются пачкой. next_reminder_at сдвигается на следующую ступень или обнуляется.
+        due_count = sum(
+            (case((Survey.sent_at + literal(offset, Interval()) <= now, 1), else_=0) for offset in stage_offsets),
+            literal(0, Integer),
+        )
+        batch = (
+            select(
+                Survey.id,
+                Survey.reminder_stage.label("previous_stage"),
+                func.greatest(due_count, Survey.reminder_stage).label("due_stage"),
+            )
             .where(
                 and_(
                     Survey.status == SurveyStatus.pending,
-                    Survey.sent_at <= border,
-                    Survey.admin_notified_at.is_(None),
+                    Survey.next_reminder_at.is_not(None),
+                    Survey.next_reminder_at <= now,
                 )
             )
+            .order_by(Survey.next_reminder_at, Survey.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .cte("batch")
         )
-        return list(result.scalars().all())
+        next_reminder_at = case(
+            {stage: Survey.sent_at + literal(offset, Interval()) for stage, offset in enumerate(stage_offsets)},
+            value=batch.c.due_stage,
+            else_=None,
+        )
+        claimed = (
+            update(Survey)
+            .where(Survey.id == batch.c.id)
+            .values(reminder_stage=batch.c.due_stage, next_reminder_at=next_reminder_at)
+            .returning(Survey.id, Survey.user_id, Survey.date, Survey.sent_at, Survey.reminder_stage, batch.c.previous_stage)
+            .cte("claimed")
+        )
+        result = await self.session.execute(
+            select(claimed, User.user_id.label("telegram_user_id"), User.username)
+            .join(User, User.id == claimed.c.user_id)
+            .order_by(claimed.c.sent_at, claimed.c.id)
+        )
+        return list(result.all())
 
-    async def mark_admin_notified(self, survey: Survey) -> None:
-        survey.admin_notified_at = datetime.utcnow()
-        await self.session.flush()
+    async def retry_reminders(self, survey_ids: Sequence[int], stage: int, retry_at: datetime) -> None:
+        # Напоминание не дошло ни до одного получателя: ступень вернется в очередь к retry_at.
+        if survey_ids:
+            await self.session.execute(
+                update(Survey)
+                .where(and_(Survey.id.in_(survey_ids), Survey.status == SurveyStatus.pending))
+                .values(reminder_stage=stage, next_reminder_at=retry_at)
+            )
 
-    async def list_answered_in_range(self, date_from: date, date_to: date) -> list[Survey]:
-        result = await self.session.execute(
-            select(Survey)
-            .options(selectinload(Survey.user), selectinload(Survey.answer))
+    async def stream_answered_in_range(
+        self,
+        date_from: date,
+        date_to: date,
+        chunk_size: int = 10_000,
+    ) -> AsyncIterator[Sequence[Row[Any]]]:
+        # Server-side cursor: в памяти одновременно только один chunk строк.
+        result = await self.session.stream(
+            select(
+                Survey.date,
+                Survey.completed_at,
+                User.user_id,
+                User.username,
+                Answer.mood,
+                Answer.campaigns_count,
+                Answer.geo_count,
+                Answer.creatives_count,
+                Answer.accounts_count,
+            )
+            .join(Answer, Answer.survey_id == Survey.id)
+            .join(User, User.id == Survey.user_id)
             .where(
                 and_(
                     Survey.status == SurveyStatus.answered,
@@ -98,5 +195,8 @@ class SurveyRepository:
                     Survey.date <= date_to,
                 )
             )
+            .order_by(Survey.date, Survey.id)
+            .execution_options(yield_per=chunk_size)
         )
-        return list(result.scalars().all())
+        async for partition in result.partitions(chunk_size):
+            yield partition
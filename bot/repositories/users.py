@@ -1,11 +1,26 @@
 from __future__ import annotations
 
-from sqlalchemy import delete, select
+import json
+from collections.abc import Iterable
+from datetime import time
+
+from sqlalchemy import delete, func, literal_column, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.db.models import User
+from bot.utils.metrics import instrument_repository
+
+# Канал LISTEN/NOTIFY, по которому лидер с планировщиком узнает об изменениях расписания пользователей.
+SCHEDULE_CHANNEL = "user_schedule"
+# Канал сброса кэша пользователей в других процессах; payload — telegram user_id.
+USER_CHANNEL = "user_invalidate"
 
+# Расписание пользователя как оно хранится: (timezone, send_time), send_time=None — время команды.
+StoredSchedule = tuple[str, time | None]
 
+
+@instrument_repository
 class UserRepository:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
@@ -14,27 +29,88 @@ class UserRepository:
         result = await self.session.execute(select(User).where(User.user_id == telegram_user_id))
         return result.scalar_one_or_none()
 
-    async def create_or_update(self, telegram_user_id: int, username: str | None) -> User:
+    async def upsert(self, telegram_user_id: int, username: str | None) -> tuple[User, bool]:
+        # Возвращает (пользователь, создан ли он сейчас): xmax = 0 только у строки, вставленной этим запросом.
+        # Неизменившийся username строку не обновляет, и тогда RETURNING пуст — читаем ее обычным SELECT.
+        stmt = insert(User).values(user_id=telegram_user_id, username=username)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.user_id],
+            set_={"username": stmt.excluded.username},
+            where=User.username.is_distinct_from(stmt.excluded.username),
+        ).returning(User, literal_column("xmax = 0").label("inserted"))
+        result = await self.session.execute(stmt, execution_options={"populate_existing": True})
+        row = result.one_or_none()
+        if row is not None:
+            return row[0], bool(row.inserted)
+        user = await self.get_by_telegram_id(telegram_user_id)
+        assert user is not None
+        return user, False
+
+    async def set_timezone(self, telegram_user_id: int, timezone: str) -> StoredSchedule | None:
+        # Возвращает прежнее расписание: по нему планировщик убирает освободившийся слот.
         user = await self.get_by_telegram_id(telegram_user_id)
         if user is None:
-            user = User(user_id=telegram_user_id, username=username)
-            self.session.add(user)
-        else:
-            user.username = username
+            return None
+        previous = (user.timezone, user.send_time)
+        user.timezone = timezone
         await self.session.flush()
-        return user
+        return previous
 
-    async def set_timezone(self, telegram_user_id: int, timezone: str) -> None:
+    async def set_send_time(self, telegram_user_id: int, send_time: time | None) -> StoredSchedule | None:
         user = await self.get_by_telegram_id(telegram_user_id)
-        if user is not None:
-            user.timezone = timezone
-            await self.session.flush()
+        if user is None:
+            return None
+        previous = (user.timezone, user.send_time)
+        user.send_time = send_time
+        await self.session.flush()
+        return previous
 
-    async def list_all(self) -> list[User]:
-        result = await self.session.execute(select(User))
+    async def list_schedules(self) -> list[StoredSchedule]:
+        result = await self.session.execute(select(User.timezone, User.send_time).distinct())
+        return [(row.timezone, row.send_time) for row in result]
+
+    async def list_by_slots(self, slots: Iterable[tuple[str, time]], default_send_time: time) -> list[User]:
+        slots = list(slots)
+        if not slots:
+            return []
+        # Условие по timezone отдельно от кортежа оставляет планировщику индекс ix_users_timezone.
+        result = await self.session.execute(
+            select(User).where(
+                User.timezone.in_({timezone for timezone, _ in slots}),
+                tuple_(User.timezone, func.coalesce(User.send_time, default_send_time)).in_(slots),
+            )
+        )
         return list(result.scalars().all())
 
-    async def delete_by_telegram_id(self, telegram_user_id: int) -> bool:
-        result = await self.session.execute(delete(User).where(User.user_id == telegram_user_id))
+    async def slot_in_use(self, timezone: str, send_time: time, default_send_time: time) -> bool:
+        result = await self.session.execute(
+            select(
+                select(User.id)
+                .where(User.timezone == timezone, func.coalesce(User.send_time, default_send_time) == send_time)
+                .exists()
+            )
+        )
+        return bool(result.scalar())
+
+    async def delete_by_telegram_id(self, telegram_user_id: int) -> StoredSchedule | None:
+        result = await self.session.execute(
+            delete(User).where(User.user_id == telegram_user_id).returning(User.timezone, User.send_time)
+        )
         await self.session.flush()
-        return bool(result.rowcount)
+        row = result.one_or_none()
+        return None if row is None else (row.timezone, row.send_time)
+
+    async def notify_invalidate(self, telegram_user_id: int) -> None:
+        await self.session.execute(select(func.pg_notify(USER_CHANNEL, str(telegram_user_id))))
+
+    async def notify_schedule_change(self, current: StoredSchedule | None, previous: StoredSchedule | None = None) -> None:
+        # NOTIFY внутри транзакции доставляется только после коммита: откаченное изменение событие не порождает.
+        payload = json.dumps({"current": _schedule_payload(current), "previous": _schedule_payload(previous)})
+        await self.session.execute(select(func.pg_notify(SCHEDULE_CHANNEL, payload)))
+
+
+def _schedule_payload(schedule: StoredSchedule | None) -> list[str | None] | None:
+    if schedule is None:
+        return None
+    timezone, send_time = schedule
+    return [timezone, None if send_time is None else send_time.strftime("%H:%M")]
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from bot.repositories.users import SCHEDULE_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+# Расписание из события: (timezone, "HH:MM" или None — время команды по умолчанию).
+EventSchedule = tuple[str, str | None]
+
+
+class ScheduleEventListener:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        on_event: Callable[[EventSchedule | None, EventSchedule | None], Awaitable[Any]],
+        on_resync: Callable[[], Awaitable[Any]],
+        channel: str = SCHEDULE_CHANNEL,
+        retry_interval: float = 5.0,
+    ) -> None:
+        self.engine = engine
+        self.on_event = on_event
+        self.on_resync = on_resync
+        self.channel = channel
+        self.retry_interval = retry_interval
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="schedule-events")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._queue = asyncio.Queue()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Schedule event listener failed, reconnecting in %ss", self.retry_interval)
+            await asyncio.sleep(self.retry_interval)
+
+    async def _listen(self) -> None:
+        async with self.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            raw = await conn.get_raw_connection()
+            driver_connection = raw.driver_connection
+            await driver_connection.add_listener(self.channel, self._on_notify)
+            logger.info("Listening for schedule events on channel %s", self.channel)
+            try:
+                # Пока никто не слушал канал (смена лидера, рестарт, переподключение), NOTIFY терялись:
+                # после каждого LISTEN, включая первый, расписание сверяется целиком.
+                await self.on_resync()
+                while True:
+                    try:
+                        payload = await asyncio.wait_for(self._queue.get(), timeout=self.retry_interval)
+                    except asyncio.TimeoutError:
+                        await conn.scalar(text("SELECT 1"))
+                        continue
+                    await self._handle(payload)
+            finally:
+                try:
+                    await asyncio.shield(driver_connection.remove_listener(self.channel, self._on_notify))
+                except Exception:
+                    await conn.invalidate()
+
+    def _on_notify(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        # Колбэк asyncpg синхронный: события обрабатываются по одному в задаче слушателя, в порядке коммитов.
+        self._queue.put_nowait(payload)
+
+    async def _handle(self, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+            await self.on_event(_schedule(event.get("current")), _schedule(event.get("previous")))
+        except Exception:
+            logger.exception("Failed to apply schedule event %s", payload)
+
+
+def _schedule(value: list[str | None] | None) -> EventSchedule | None:
+    if value is None:
+        return None
+    timezone, send_time = value
+    return timezone, send_time
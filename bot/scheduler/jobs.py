@@ -1,27 +1,90 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 from datetime import date, datetime, time, timedelta, timezone
+from typing import Any
 
-from aiogram import Bot
+from apscheduler.jobstores.base import BaseJobStore
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from sqlalchemy import Engine, Row
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
+from bot.domain.reminders import ReminderStage, first_reminder_after
 from bot.keyboards.survey import mood_keyboard
 from bot.repositories.surveys import SurveyRepository
 from bot.repositories.users import UserRepository
-from bot.utils.timezone import tzinfo_from_stored
+from bot.scheduler.reconciler import DesiredJob, JobReconciler, SyncStats
+from bot.services.message_dispatcher import MessageDispatcher
+from bot.utils.text import TELEGRAM_MESSAGE_LIMIT, split_blocks
+from bot.utils.timezone import SURVEY_TIME, NextFireTable
 
 logger = logging.getLogger(__name__)
 
+# Через сколько повторить ступень для админа, если уведомление не дошло ни до одного получателя.
+REMINDER_RETRY_AFTER = timedelta(minutes=30)
+MEMORY_JOBSTORE = "default"
+SURVEY_JOBSTORE = "surveys"
+
+# Слот рассылки: таймзона и локальное время отправки.
+ScheduleSlot = tuple[str, time]
+
+_active_service: SchedulerService | None = None
+
+
+async def run_survey_bucket_job(run_at: str, targets: dict[str, str]) -> None:
+    # Job в постоянном хранилище сериализуется ссылкой на функцию модуля, а не на bound-метод сервиса.
+    if _active_service is None:
+        logger.warning("Survey bucket at=%s fired without an active scheduler service", run_at)
+        return
+    await _active_service.send_survey_bucket_job(run_at, targets)
+
 
 class SchedulerService:
-    def __init__(self, bot: Bot, session_factory: async_sessionmaker, admin_id: int, report_chat_id: int | None = None) -> None:
-        self.bot = bot
+    def __init__(
+        self,
+        dispatcher: MessageDispatcher,
+        session_factory: async_sessionmaker,
+        admin_id: int,
+        report_chat_id: int | None = None,
+        overdue_digest: bool = False,
+        overdue_batch_size: int = 500,
+        jobstore_engine: Engine | None = None,
+        misfire_grace_time: int = 3 * 60 * 60,
+        full_sync_minutes: int = 6 * 60,
+        fire_table: NextFireTable | None = None,
+        default_send_time: time = SURVEY_TIME,
+        reminder_stages: tuple[ReminderStage, ...] = (),
+        reminder_tick_seconds: int = 60,
+    ) -> None:
+        self.dispatcher = dispatcher
         self.session_factory = session_factory
         self.admin_id = admin_id
         self.report_chat_id = report_chat_id
-        self.scheduler = AsyncIOScheduler(timezone="UTC")
+        self.overdue_digest = overdue_digest
+        self.overdue_batch_size = overdue_batch_size
+        self.reminder_stages = reminder_stages
+        self.reminder_tick_seconds = reminder_tick_seconds
+        self.full_sync_minutes = full_sync_minutes
+        self.default_send_time = default_send_time
+        self.fire_table = fire_table or NextFireTable(default_send_time)
+        # Рассылки по бакетам лежат в БД и переживают рестарт; интервальные job каждый лидер создает заново в памяти.
+        jobstores: dict[str, BaseJobStore] = {MEMORY_JOBSTORE: MemoryJobStore()}
+        jobstores[SURVEY_JOBSTORE] = (
+            SQLAlchemyJobStore(engine=jobstore_engine) if jobstore_engine is not None else MemoryJobStore()
+        )
+        self.scheduler = AsyncIOScheduler(
+            timezone="UTC",
+            jobstores=jobstores,
+            job_defaults={"coalesce": True, "misfire_grace_time": misfire_grace_time},
+        )
+        self.reconciler = JobReconciler(self.scheduler, run_survey_bucket_job, jobstore=SURVEY_JOBSTORE)
+        # Полная сверка и события меняют одни и те же бакеты: событие, примененное между снимком
+        # пользователей и reconcile, сверка бы откатила до следующего полного прохода.
+        self._schedule_lock = asyncio.Lock()
+        self.last_sync_stats: SyncStats | None = None
 
     @property
     def report_targets(self) -> list[int]:
@@ -30,113 +93,338 @@ class SchedulerService:
         return [self.admin_id, self.report_chat_id]
 
     def start(self) -> None:
-        self.scheduler.add_job(self.sync_deferred_survey_jobs, "interval", minutes=10, id="sync_deferred_surveys", replace_existing=True)
-        self.scheduler.add_job(self.notify_overdue_surveys, "interval", minutes=30, id="overdue_notify", replace_existing=True)
+        global _active_service
+        _active_service = self
+        # Расписание поддерживается событиями пользователей (apply_schedule_event);
+        # полный пересчет остается редкой сверкой на случай потерянных событий.
+        self.scheduler.add_job(
+            self.sync_deferred_survey_jobs,
+            "interval",
+            minutes=self.full_sync_minutes,
+            id="sync_deferred_surveys",
+            jobstore=MEMORY_JOBSTORE,
+            replace_existing=True,
+        )
+        if self.reminder_stages:
+            # Тик читает только наступившие напоминания по индексу очереди, поэтому может быть частым.
+            self.scheduler.add_job(
+                self.process_due_reminders,
+                "interval",
+                seconds=self.reminder_tick_seconds,
+                id="reminders",
+                jobstore=MEMORY_JOBSTORE,
+                replace_existing=True,
+            )
         self.scheduler.start()
-        # Первая синхронизация сразу после старта.
-        self.scheduler.add_job(self.sync_deferred_survey_jobs, "date", run_date=datetime.now(tz=timezone.utc) + timedelta(seconds=1))
+
+        # Индекс реконсилера заполняется из хранилища, а пропущенные в пределах misfire_grace_time бакеты
+        # планировщик догонит сам. Полная сверка при старте обязательна: бакеты старше grace-периода
+        # планировщик отбрасывает, и без нее следующий день не был бы запланирован до интервальной сверки.
+        self.warm_start()
+        self.scheduler.add_job(
+            self.sync_deferred_survey_jobs,
+            "date",
+            run_date=datetime.now(tz=timezone.utc) + timedelta(seconds=1),
+            jobstore=MEMORY_JOBSTORE,
+        )
+
+    def warm_start(self) -> int:
+        self.reconciler.clear()
+        jobs = self.scheduler.get_jobs(jobstore=SURVEY_JOBSTORE)
+        for job in jobs:
+            run_at = datetime.fromisoformat(job.kwargs["run_at"])
+            self.reconciler.adopt(run_at, DesiredJob(job_id=job.id, run_at=run_at, kwargs=job.kwargs))
+        logger.info("Scheduler warm start: loaded %s survey bucket jobs", len(jobs))
+        return len(jobs)
 
     def shutdown(self) -> None:
+        global _active_service
         if self.scheduler.running:
+            # Бакеты рассылки остаются в хранилище для следующего лидера; интервальные job он создаст сам.
+            self.scheduler.remove_all_jobs(jobstore=MEMORY_JOBSTORE)
             self.scheduler.shutdown(wait=False)
+        self.reconciler.clear()
+        if _active_service is self:
+            _active_service = None
+
+    async def sync_deferred_survey_jobs(self) -> SyncStats:
+        async with self._schedule_lock:
+            return await self._sync_deferred_survey_jobs()
 
-    async def sync_deferred_survey_jobs(self) -> None:
+    async def _sync_deferred_survey_jobs(self) -> SyncStats:
         now_utc = datetime.now(tz=timezone.utc)
         async with self.session_factory() as session:
             user_repo = UserRepository(session)
-            users = await user_repo.list_all()
+            slots = {self._resolve_slot(user_timezone, send_time) for user_timezone, send_time in await user_repo.list_schedules()}
 
-        for user in users:
-            target_local_date, run_at_utc = self._next_run_for_user(user.timezone, now_utc)
-            job_id = self._job_id(user.user_id, target_local_date)
-
-            # Удаляем устаревшие отложенные job для пользователя (например, после смены таймзоны).
-            prefix = self._user_job_prefix(user.user_id)
-            for existing_job in self.scheduler.get_jobs():
-                if existing_job.id.startswith(prefix) and existing_job.id != job_id:
-                    self.scheduler.remove_job(existing_job.id)
-                    logger.info("Removed stale deferred survey job_id=%s user_id=%s", existing_job.id, user.user_id)
-
-            existing = self.scheduler.get_job(job_id)
-            if existing is not None and existing.next_run_time is not None:
-                delta = abs((existing.next_run_time - run_at_utc).total_seconds())
-                if delta <= 60:
-                    continue
-                self.scheduler.remove_job(job_id)
-                logger.info(
-                    "Rescheduling deferred job_id=%s user_id=%s old=%s new=%s",
-                    job_id,
-                    user.user_id,
-                    existing.next_run_time.isoformat(),
-                    run_at_utc.isoformat(),
-                )
+        # Разные слоты (таймзона, время) часто делят один UTC-момент запуска,
+        # поэтому одна job на момент, а не на пользователя или слот.
+        desired: dict[datetime, DesiredJob] = {}
+        for slot in slots:
+            target_local_date, run_at_utc = self._next_run_for_slot(slot, now_utc)
+            job = desired.get(run_at_utc)
+            if job is None:
+                job = self._bucket_job(run_at_utc, {})
+                desired[run_at_utc] = job
+            job.kwargs["targets"][self._slot_key(slot)] = target_local_date.isoformat()
 
-            self.scheduler.add_job(
-                self.send_daily_survey_job,
-                "date",
-                run_date=run_at_utc,
-                id=job_id,
-                kwargs={
-                    "telegram_user_id": user.user_id,
-                    "user_db_id": user.id,
-                    "survey_date": target_local_date.isoformat(),
-                },
-                replace_existing=True,
-            )
+        stats = self.reconciler.reconcile(desired)
+        self.last_sync_stats = stats
+        logger.info(
+            "Deferred survey sync: slots=%s buckets=%s added=%s removed=%s rescheduled=%s unchanged=%s duration=%.3fs",
+            len(slots),
+            len(desired),
+            stats.added,
+            stats.removed,
+            stats.rescheduled,
+            stats.unchanged,
+            stats.duration,
+        )
+        return stats
+
+    async def apply_schedule_event(
+        self,
+        current: tuple[str, str | None] | None,
+        previous: tuple[str, str | None] | None,
+    ) -> None:
+        async with self._schedule_lock:
+            await self._apply_schedule_event(current, previous)
+
+    async def _apply_schedule_event(
+        self,
+        current: tuple[str, str | None] | None,
+        previous: tuple[str, str | None] | None,
+    ) -> None:
+        now_utc = datetime.now(tz=timezone.utc)
+        current_slot = self._slot_from_event(current)
+        previous_slot = self._slot_from_event(previous)
+        added = removed = False
+        if current_slot is not None:
+            added = self._ensure_slot(current_slot, now_utc)
+        if previous_slot is not None and previous_slot != current_slot:
+            async with self.session_factory() as session:
+                in_use = await UserRepository(session).slot_in_use(*previous_slot, self.default_send_time)
+            if not in_use:
+                removed = self._drop_slot(previous_slot, now_utc)
+        if added or removed:
             logger.info(
-                "Scheduled deferred survey job_id=%s user_id=%s at=%s",
-                job_id,
-                user.user_id,
-                run_at_utc.isoformat(),
+                "Schedule event applied: slot=%s previous=%s added=%s removed=%s",
+                current_slot and self._slot_key(current_slot),
+                previous_slot and self._slot_key(previous_slot),
+                added,
+                removed,
             )
 
-    async def send_daily_survey_job(self, telegram_user_id: int, user_db_id: int, survey_date: str) -> None:
-        target_date = date.fromisoformat(survey_date)
+    def _ensure_slot(self, slot: ScheduleSlot, now_utc: datetime) -> bool:
+        target_local_date, run_at_utc = self._next_run_for_slot(slot, now_utc)
+        key = self._slot_key(slot)
+        current = self.reconciler.get(run_at_utc)
+        targets = dict(current.kwargs["targets"]) if current is not None else {}
+        if targets.get(key) == target_local_date.isoformat():
+            return False
+        targets[key] = target_local_date.isoformat()
+        self.reconciler.apply(run_at_utc, self._bucket_job(run_at_utc, targets))
+        return True
+
+    def _drop_slot(self, slot: ScheduleSlot, now_utc: datetime) -> bool:
+        _, run_at_utc = self._next_run_for_slot(slot, now_utc)
+        key = self._slot_key(slot)
+        current = self.reconciler.get(run_at_utc)
+        if current is None or key not in current.kwargs["targets"]:
+            return False
+        targets = {name: day for name, day in current.kwargs["targets"].items() if name != key}
+        self.reconciler.apply(run_at_utc, self._bucket_job(run_at_utc, targets) if targets else None)
+        return True
+
+    async def send_survey_bucket_job(self, run_at: str, targets: dict[str, str]) -> None:
+        slots = {self._parse_slot_key(key): date.fromisoformat(day) for key, day in targets.items()}
+        async with self._schedule_lock:
+            self.reconciler.forget(datetime.fromisoformat(run_at))
+            # Следующий день тех же слотов планируется сразу, не дожидаясь полной сверки.
+            now_utc = datetime.now(tz=timezone.utc)
+            for slot in slots:
+                self._ensure_slot(slot, now_utc)
         async with self.session_factory() as session:
+            user_repo = UserRepository(session)
             survey_repo = SurveyRepository(session)
             async with session.begin():
-                survey, created = await survey_repo.create_daily_if_absent(user_db_id=user_db_id, survey_date=target_date)
-                if not created:
-                    logger.info("Skip deferred send for user_id=%s date=%s (survey already exists)", telegram_user_id, target_date)
-                    return
+                users = await user_repo.list_by_slots(slots, self.default_send_time)
+                survey_dates = {user.id: slots[self._resolve_slot(user.timezone, user.send_time)] for user in users}
+                surveys = await survey_repo.create_daily_bulk(
+                    list(survey_dates.items()), first_reminder_after(self.reminder_stages)
+                )
 
-            await self.bot.send_message(chat_id=telegram_user_id, text="1) Настроение", reply_markup=mood_keyboard(survey.id))
-            logger.info("Deferred survey sent to user_id=%s survey_id=%s", telegram_user_id, survey.id)
+        outgoing: list[tuple[int, int]] = []
+        for user in users:
+            survey, created = surveys[(user.id, survey_dates[user.id])]
+            if created:
+                outgoing.append((user.user_id, survey.id))
+        logger.info(
+            "Survey bucket at=%s slots=%s users=%s new_surveys=%s",
+            run_at,
+            len(targets),
+            len(users),
+            len(outgoing),
+        )
 
-    async def notify_overdue_surveys(self) -> None:
-        async with self.session_factory() as session:
-            repo = SurveyRepository(session)
-            async with session.begin():
-                surveys = await repo.pending_overdue_without_admin_notification()
-                for survey in surveys:
-                    overdue_text = (
-                        "<b>⏰ Нет ответа на daily survey более 12 часов</b>\n"
-                        f"🗓 Дата: <b>{survey.date.isoformat()}</b>\n"
-                        f"👤 Пользователь: <b>@{survey.user.username if survey.user and survey.user.username else '-'}</b>\n"
-                        f"🆔 user_id: <code>{survey.user.user_id if survey.user else '-'}</code>"
-                    )
-                    for target in self.report_targets:
-                        await self.bot.send_message(chat_id=target, text=overdue_text)
-                    await repo.mark_admin_notified(survey)
+        results = await asyncio.gather(
+            *(
+                self.dispatcher.send_message(chat_id=telegram_user_id, text="1) Настроение", reply_markup=mood_keyboard(survey_id))
+                for telegram_user_id, survey_id in outgoing
+            ),
+            return_exceptions=True,
+        )
+        for (telegram_user_id, survey_id), result in zip(outgoing, results):
+            if isinstance(result, Exception):
+                logger.warning("Failed to send deferred survey to user_id=%s survey_id=%s: %s", telegram_user_id, survey_id, result)
+
+        dispatcher_stats = self.dispatcher.stats
+        logger.info(
+            "Survey bucket at=%s sent=%s failed=%s queue_depth=%s avg_latency=%.3fs",
+            run_at,
+            sum(not isinstance(result, Exception) for result in results),
+            sum(isinstance(result, Exception) for result in results),
+            dispatcher_stats.queue_depth,
+            dispatcher_stats.avg_latency,
+        )
+
+    async def process_due_reminders(self) -> None:
+        now_utc = datetime.now(tz=timezone.utc)
+        offsets = [stage.after for stage in self.reminder_stages]
+        sent = retried = 0
+        while True:
+            # Каждая страница переводится на следующую ступень и коммитится до отправки: ошибка отправки
+            # не откатывает уже разосланное.
+            async with self.session_factory() as session:
+                async with session.begin():
+                    batch = await SurveyRepository(session).claim_due_reminders(now_utc, offsets, limit=self.overdue_batch_size)
+            if not batch:
+                break
+
+            # Строки без новой ступени (например, после смены REMINDER_STAGES) только перепланированы.
+            by_stage: dict[int, list[Row[Any]]] = {}
+            for row in batch:
+                if row.reminder_stage > row.previous_stage:
+                    by_stage.setdefault(row.reminder_stage - 1, []).append(row)
+
+            for stage_index, rows in sorted(by_stage.items()):
+                stage = self.reminder_stages[stage_index]
+                if stage.audience == "user":
+                    # Пользователь мог заблокировать бота: повтор напоминания ему не поможет.
+                    await self._send_user_reminders(rows)
+                    sent += len(rows)
+                    continue
+                undelivered = await (
+                    self._send_overdue_digest(rows, stage) if self.overdue_digest else self._send_overdue_each(rows, stage)
+                )
+                if undelivered:
+                    async with self.session_factory() as session:
+                        async with session.begin():
+                            await SurveyRepository(session).retry_reminders(
+                                sorted(undelivered), stage_index, now_utc + REMINDER_RETRY_AFTER
+                            )
+                sent += len(rows) - len(undelivered)
+                retried += len(undelivered)
+            if len(batch) < self.overdue_batch_size:
+                break
+
+        if sent or retried:
+            logger.info("Reminder tick: sent=%s retried=%s digest=%s", sent, retried, self.overdue_digest)
+
+    async def _send_user_reminders(self, rows: list[Row[Any]]) -> None:
+        results = await asyncio.gather(
+            *(
+                self.dispatcher.send_message(
+                    chat_id=row.telegram_user_id,
+                    text=f"⏰ Напоминание: опрос за <b>{row.date.isoformat()}</b> еще не пройден.\n\n1) Настроение",
+                    reply_markup=mood_keyboard(row.id),
+                )
+                for row in rows
+            ),
+            return_exceptions=True,
+        )
+        for row, result in zip(rows, results):
+            if isinstance(result, Exception):
+                logger.warning("Failed to send reminder to user_id=%s survey_id=%s: %s", row.telegram_user_id, row.id, result)
+
+    async def _send_overdue_each(self, batch: list[Row[Any]], stage: ReminderStage) -> set[int]:
+        return await self._deliver_overdue(
+            [([row.id], target, self._overdue_text(row, stage)) for row in batch for target in self.report_targets]
+        )
+
+    async def _send_overdue_digest(self, batch: list[Row[Any]], stage: ReminderStage) -> set[int]:
+        # Одна строка на анкету, поэтому по числу строк в сообщении восстанавливается, какие анкеты в нем.
+        lines = [self._overdue_digest_line(row) for row in batch]
+        outgoing: list[tuple[list[int], int, str]] = []
+        offset = 0
+        for body in split_blocks(lines, limit=TELEGRAM_MESSAGE_LIMIT - 128, separator="\n"):
+            count = body.count("\n") + 1
+            survey_ids = [row.id for row in batch[offset : offset + count]]
+            offset += count
+            text = f"<b>⏰ Нет ответа на daily survey более {stage.label}: {count}</b>\n\n{body}"
+            outgoing.extend((survey_ids, target, text) for target in self.report_targets)
+        return await self._deliver_overdue(outgoing)
+
+    async def _deliver_overdue(self, outgoing: list[tuple[list[int], int, str]]) -> set[int]:
+        results = await asyncio.gather(
+            *(self.dispatcher.send_message(chat_id=target, text=text) for _, target, text in outgoing),
+            return_exceptions=True,
+        )
+        delivered: set[int] = set()
+        failed: set[int] = set()
+        for (survey_ids, target, _), result in zip(outgoing, results):
+            if isinstance(result, Exception):
+                logger.warning("Failed to send overdue notice for %s surveys to chat_id=%s: %s", len(survey_ids), target, result)
+                failed.update(survey_ids)
+            else:
+                delivered.update(survey_ids)
+        # Если хотя бы один получатель уведомление получил, повтор дал бы ему дубль.
+        return failed - delivered
 
     @staticmethod
-    def _job_id(telegram_user_id: int, survey_date: date) -> str:
-        return f"deferred_survey:{telegram_user_id}:{survey_date.isoformat()}"
+    def _overdue_text(row: Row[Any], stage: ReminderStage) -> str:
+        return (
+            f"<b>⏰ Нет ответа на daily survey более {stage.label}</b>\n"
+            f"🗓 Дата: <b>{row.date.isoformat()}</b>\n"
+            f"👤 Пользователь: <b>@{row.username or '-'}</b>\n"
+            f"🆔 user_id: <code>{row.telegram_user_id}</code>"
+        )
 
     @staticmethod
-    def _user_job_prefix(telegram_user_id: int) -> str:
-        return f"deferred_survey:{telegram_user_id}:"
+    def _overdue_digest_line(row: Row[Any]) -> str:
+        return f"• <b>@{row.username or '-'}</b> (<code>{row.telegram_user_id}</code>) — {row.date.isoformat()}"
 
     @staticmethod
-    def _next_run_for_user(user_timezone: str, now_utc: datetime) -> tuple[date, datetime]:
-        tz = tzinfo_from_stored(user_timezone)
-        now_local = now_utc.astimezone(tz)
-        today_target_local = datetime.combine(now_local.date(), time(hour=20, minute=0), tzinfo=tz)
-
-        if now_local < today_target_local:
-            target_local = today_target_local
-        else:
-            tomorrow = now_local.date() + timedelta(days=1)
-            target_local = datetime.combine(tomorrow, time(hour=20, minute=0), tzinfo=tz)
-
-        return target_local.date(), target_local.astimezone(timezone.utc)
+    def _job_id(run_at_utc: datetime) -> str:
+        return f"deferred_survey_bucket:{run_at_utc:%Y%m%dT%H%M}"
+
+    @classmethod
+    def _bucket_job(cls, run_at_utc: datetime, targets: dict[str, str]) -> DesiredJob:
+        return DesiredJob(
+            job_id=cls._job_id(run_at_utc),
+            run_at=run_at_utc,
+            kwargs={"run_at": run_at_utc.isoformat(), "targets": targets},
+        )
+
+    def _next_run_for_slot(self, slot: ScheduleSlot, now_utc: datetime) -> tuple[date, datetime]:
+        user_timezone, send_time = slot
+        fire_slot = self.fire_table.get(user_timezone, now_utc, send_time)
+        return fire_slot.target_date, fire_slot.fire_at
+
+    def _resolve_slot(self, user_timezone: str, send_time: time | None) -> ScheduleSlot:
+        return user_timezone, send_time if send_time is not None else self.default_send_time
+
+    def _slot_from_event(self, schedule: tuple[str, str | None] | None) -> ScheduleSlot | None:
+        if schedule is None:
+            return None
+        user_timezone, send_time = schedule
+        return self._resolve_slot(user_timezone, None if send_time is None else time.fromisoformat(send_time))
+
+    @staticmethod
+    def _slot_key(slot: ScheduleSlot) -> str:
+        return f"{slot[0]}@{slot[1]:%H:%M}"
+
+    def _parse_slot_key(self, key: str) -> ScheduleSlot:
+        # Бакеты, сохраненные до появления времени рассылки, содержат только таймзону.
+        user_timezone, _, send_time = key.partition("@")
+        return self._resolve_slot(user_timezone, time.fromisoformat(send_time) if send_time else None)
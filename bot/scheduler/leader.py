@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Ключ PostgreSQL advisory lock, который держит процесс-лидер с планировщиком.
+SCHEDULER_LEADER_LOCK = 7_305_001
+
+
+class LeaderElector:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        on_elected: Callable[[], Awaitable[None]],
+        on_demoted: Callable[[], Awaitable[None]],
+        lock_key: int = SCHEDULER_LEADER_LOCK,
+        retry_interval: float = 5.0,
+    ) -> None:
+        self.engine = engine
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.lock_key = lock_key
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="leader-elector")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._campaign()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Leader election failed, retrying in %ss", self.retry_interval)
+            await asyncio.sleep(self.retry_interval)
+
+    async def _campaign(self) -> None:
+        # Отдельное соединение в autocommit: session-level lock живет, пока живо соединение,
+        # и освобождается PostgreSQL сам, если процесс-лидер упал.
+        async with self.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            acquired = await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key})
+            if not acquired:
+                return
+
+            logger.info("Acquired scheduler leadership (lock=%s)", self.lock_key)
+            self.is_leader = True
+            try:
+                await self.on_elected()
+                while True:
+                    await asyncio.sleep(self.retry_interval)
+                    await conn.scalar(text("SELECT 1"))
+            finally:
+                self.is_leader = False
+                logger.info("Lost scheduler leadership (lock=%s)", self.lock_key)
+                await self.on_demoted()
+                await self._release(conn)
+
+    async def _release(self, conn: AsyncConnection) -> None:
+        try:
+            await asyncio.shield(conn.scalar(text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key}))
+        except Exception:
+            # Соединение в неизвестном состоянии: закрываем его, чтобы lock не вернулся в пул вместе с ним.
+            await conn.invalidate()
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.schedulers.base import BaseScheduler
+
+
+@dataclass(slots=True)
+class DesiredJob:
+    job_id: str
+    run_at: datetime
+    kwargs: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class SyncStats:
+    added: int = 0
+    removed: int = 0
+    rescheduled: int = 0
+    unchanged: int = 0
+    duration: float = 0.0
+
+
+# Держит индекс key -> запланированная job и применяет к планировщику только разницу.
+class JobReconciler:
+    def __init__(
+        self,
+        scheduler: BaseScheduler,
+        func: Callable[..., Any],
+        tolerance_seconds: float = 60,
+        jobstore: str = "default",
+    ) -> None:
+        self.scheduler = scheduler
+        self.func = func
+        self.tolerance_seconds = tolerance_seconds
+        self.jobstore = jobstore
+        self._index: dict[Hashable, DesiredJob] = {}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, key: Hashable) -> DesiredJob | None:
+        return self._index.get(key)
+
+    def forget(self, key: Hashable) -> None:
+        self._index.pop(key, None)
+
+    def adopt(self, key: Hashable, job: DesiredJob) -> None:
+        # Job уже лежит в планировщике (например, загружена из постоянного хранилища): только индексируем.
+        self._index[key] = job
+
+    def clear(self) -> None:
+        self._index.clear()
+
+    def reconcile(self, desired: dict[Hashable, DesiredJob]) -> SyncStats:
+        started = time.perf_counter()
+        stats = SyncStats()
+        now = datetime.now(tz=timezone.utc)
+
+        for key in self._index.keys() - desired.keys():
+            current = self._index[key]
+            if current.run_at <= now:
+                # Момент запуска уже наступил: job догоняет пропуск (misfire grace) и уберется сама после отправки.
+                if self.scheduler.get_job(current.job_id, jobstore=self.jobstore) is None:
+                    del self._index[key]
+                continue
+            if self._remove(self._index.pop(key).job_id):
+                stats.removed += 1
+
+        for key, job in desired.items():
+            self._apply(key, job, stats)
+
+        stats.duration = time.perf_counter() - started
+        return stats
+
+    def apply(self, key: Hashable, job: DesiredJob | None) -> SyncStats:
+        # Точечное изменение одного ключа (None — убрать job) без прохода по всему расписанию.
+        started = time.perf_counter()
+        stats = SyncStats()
+        if job is not None:
+            self._apply(key, job, stats)
+        else:
+            current = self._index.pop(key, None)
+            if current is not None and self._remove(current.job_id):
+                stats.removed += 1
+        stats.duration = time.perf_counter() - started
+        return stats
+
+    def _apply(self, key: Hashable, job: DesiredJob, stats: SyncStats) -> None:
+        current = self._index.get(key)
+        if current is None:
+            self._add(job)
+            stats.added += 1
+        elif current.job_id != job.job_id:
+            if self._remove(current.job_id):
+                stats.removed += 1
+            self._add(job)
+            stats.added += 1
+        elif abs((current.run_at - job.run_at).total_seconds()) <= self.tolerance_seconds and current.kwargs == job.kwargs:
+            stats.unchanged += 1
+            return
+        else:
+            self._reschedule(job)
+            stats.rescheduled += 1
+        self._index[key] = job
+
+    def _add(self, job: DesiredJob) -> None:
+        self.scheduler.add_job(
+            self.func,
+            "date",
+            run_date=job.run_at,
+            id=job.job_id,
+            kwargs=job.kwargs,
+            jobstore=self.jobstore,
+            replace_existing=True,
+        )
+
+    def _remove(self, job_id: str) -> bool:
+        try:
+            self.scheduler.remove_job(job_id, jobstore=self.jobstore)
+        except JobLookupError:
+            # Job уже отработала (date-trigger удаляется после запуска).
+            return False
+        return True
+
+    def _reschedule(self, job: DesiredJob) -> None:
+        try:
+            self.scheduler.modify_job(job.job_id, jobstore=self.jobstore, kwargs=job.kwargs)
+            self.scheduler.reschedule_job(job.job_id, jobstore=self.jobstore, trigger="date", run_date=job.run_at)
+        except JobLookupError:
+            self._add(job)
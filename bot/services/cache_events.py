@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from bot.repositories.stats import STATS_CHANNEL
+from bot.repositories.users import USER_CHANNEL
+from bot.services.stats_cache import StatsCache
+from bot.services.user_cache import UserCache
+
+logger = logging.getLogger(__name__)
+
+
+class CacheInvalidationListener:
+    # При WORKERS > 1 данные меняет один процесс, а читают из своих кэшей все: кэши сбрасываются по NOTIFY.
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        stats_cache: StatsCache,
+        user_cache: UserCache,
+        retry_interval: float = 5.0,
+    ) -> None:
+        self.engine = engine
+        self.stats_cache = stats_cache
+        self.user_cache = user_cache
+        self.retry_interval = retry_interval
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="cache-invalidation")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Cache invalidation listener failed, reconnecting in %ss", self.retry_interval)
+            # Пока соединения не было, сбросы могли потеряться: кэши не переживают переподключение.
+            self._clear()
+            await asyncio.sleep(self.retry_interval)
+
+    async def _listen(self) -> None:
+        async with self.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            raw = await conn.get_raw_connection()
+            driver_connection = raw.driver_connection
+            await driver_connection.add_listener(STATS_CHANNEL, self._on_stats)
+            await driver_connection.add_listener(USER_CHANNEL, self._on_user)
+            logger.info("Listening for cache invalidation on channels %s, %s", STATS_CHANNEL, USER_CHANNEL)
+            try:
+                self._clear()
+                while True:
+                    await asyncio.sleep(self.retry_interval)
+                    await conn.scalar(text("SELECT 1"))
+            finally:
+                try:
+                    await asyncio.shield(driver_connection.remove_listener(STATS_CHANNEL, self._on_stats))
+                    await asyncio.shield(driver_connection.remove_listener(USER_CHANNEL, self._on_user))
+                except Exception:
+                    await conn.invalidate()
+
+    def _clear(self) -> None:
+        self.stats_cache.clear()
+        self.user_cache.clear()
+
+    def _on_stats(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        # Сброс синхронный и дешевый, поэтому выполняется прямо в колбэке asyncpg.
+        if not payload:
+            self.stats_cache.clear()
+            return
+        try:
+            self.stats_cache.invalidate_date(date.fromisoformat(payload))
+        except ValueError:
+            logger.warning("Invalid stats invalidation payload %r", payload)
+            self.stats_cache.clear()
+
+    def _on_user(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        try:
+            self.user_cache.invalidate(int(payload))
+        except ValueError:
+            logger.warning("Invalid user invalidation payload %r", payload)
+            self.user_cache.clear()
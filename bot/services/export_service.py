@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import logging
+from collections.abc import Sequence
+from datetime import date
+from pathlib import Path
+from typing import Any, Protocol
+
+import numpy as np
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from bot.domain.scoring import ScoringEngine
+from bot.repositories.surveys import SurveyRepository
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "parquet")
+EXPORT_COLUMNS = (
+    "date",
+    "completed_at",
+    "user_id",
+    "username",
+    "mood",
+    "campaigns",
+    "geo",
+    "creatives",
+    "accounts",
+    "campaigns_color",
+    "geo_color",
+    "creatives_color",
+    "accounts_color",
+    "score",
+    "final_color",
+)
+
+
+class _ChunkWriter(Protocol):
+    def write(self, columns: dict[str, list[Any]]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class _CsvWriter:
+    def __init__(self, path: Path) -> None:
+        self._file = path.open("w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(EXPORT_COLUMNS)
+
+    def write(self, columns: dict[str, list[Any]]) -> None:
+        self._writer.writerows(zip(*(columns[name] for name in EXPORT_COLUMNS)))
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path: Path) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema(
+            [
+                ("date", pa.date32()),
+                ("completed_at", pa.timestamp("us", tz="UTC")),
+                ("user_id", pa.int64()),
+                ("username", pa.string()),
+                ("mood", pa.string()),
+                ("campaigns", pa.int32()),
+                ("geo", pa.int32()),
+                ("creatives", pa.int32()),
+                ("accounts", pa.int32()),
+                ("campaigns_color", pa.string()),
+                ("geo_color", pa.string()),
+                ("creatives_color", pa.string()),
+                ("accounts_color", pa.string()),
+                ("score", pa.float64()),
+                ("final_color", pa.string()),
+            ]
+        )
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, columns: dict[str, list[Any]]) -> None:
+        # Каждый chunk — отдельная row group: память не растет с размером выгрузки.
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class ExportService:
+    def __init__(self, session_factory: async_sessionmaker, chunk_size: int = 10_000) -> None:
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size
+        self.scoring_engine = ScoringEngine()
+
+    async def export(self, date_from: date, date_to: date, fmt: str, destination: Path) -> int:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+
+        writer: _ChunkWriter = _CsvWriter(destination) if fmt == "csv" else _ParquetWriter(destination)
+        rows = 0
+        try:
+            async with self.session_factory() as session:
+                repo = SurveyRepository(session)
+                async for chunk in repo.stream_answered_in_range(date_from, date_to, chunk_size=self.chunk_size):
+                    columns = self._build_columns(chunk)
+                    # Запись на диск уходит в поток, чтобы не блокировать event loop на больших выгрузках.
+                    await asyncio.to_thread(writer.write, columns)
+                    rows += len(chunk)
+        finally:
+            await asyncio.to_thread(writer.close)
+
+        logger.info("Exported %s answered surveys (%s..%s) to %s", rows, date_from, date_to, destination)
+        return rows
+
+    def _build_columns(self, chunk: Sequence[Row[Any]]) -> dict[str, list[Any]]:
+        campaigns = np.fromiter((row.campaigns_count for row in chunk), dtype=np.int64, count=len(chunk))
+        geo = np.fromiter((row.geo_count for row in chunk), dtype=np.int64, count=len(chunk))
+        creatives = np.fromiter((row.creatives_count for row in chunk), dtype=np.int64, count=len(chunk))
+        accounts = np.fromiter((row.accounts_count for row in chunk), dtype=np.int64, count=len(chunk))
+        scores = self.scoring_engine.score_batch(campaigns, geo, creatives, accounts)
+
+        return {
+            "date": [row.date for row in chunk],
+            "completed_at": [row.completed_at for row in chunk],
+            "user_id": [row.user_id for row in chunk],
+            "username": [row.username for row in chunk],
+            "mood": [row.mood for row in chunk],
+            "campaigns": campaigns.tolist(),
+            "geo": geo.tolist(),
+            "creatives": creatives.tolist(),
+            "accounts": accounts.tolist(),
+            "campaigns_color": self.scoring_engine.colors(scores.campaigns_code),
+            "geo_color": self.scoring_engine.colors(scores.geo_code),
+            "creatives_color": self.scoring_engine.colors(scores.creatives_code),
+            "accounts_color": self.scoring_engine.colors(scores.accounts_code),
+            "score": scores.average.tolist(),
+            "final_color": self.scoring_engine.colors(scores.final_code),
+        }
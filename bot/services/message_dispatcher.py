@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage, TelegramMethod
+from aiogram.types import Message
+
+from bot.utils.metrics import SEND_LATENCY_SECONDS, TELEGRAM_ERRORS, TELEGRAM_RETRY_AFTER
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Лимиты Telegram: ~30 сообщений/сек на бота, ~1/сек в личный чат, ~20/мин в группу.
+GLOBAL_RATE = 30.0
+PRIVATE_CHAT_RATE = 1.0
+GROUP_CHAT_RATE = 20 / 60
+IDLE_CHAT_TTL = 120.0
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = asyncio.get_running_loop().time()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            wait = self.delay(loop.time())
+            if wait <= 0:
+                self.tokens -= 1
+                return
+            await asyncio.sleep(wait)
+
+    def delay(self, now: float) -> float:
+        # Сколько ждать до появления целого токена; 0 — можно отправлять сейчас.
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+
+@dataclass(slots=True)
+class DispatcherStats:
+    queue_depth: int
+    sent: int
+    failed: int
+    retry_after: int
+    avg_latency: float
+    max_latency: float
+
+
+@dataclass(slots=True)
+class _Outgoing:
+    method: TelegramMethod[Any]
+    future: asyncio.Future[Any]
+    enqueued_at: float
+
+
+@dataclass(slots=True)
+class _ChatState:
+    bucket: TokenBucket
+    last_used: float
+    pending: deque[_Outgoing] = field(default_factory=deque)
+    # Сообщение чата уже у воркера: следующее встанет в очередь готовности только после него.
+    busy: bool = False
+
+
+class MessageDispatcher:
+    def __init__(
+        self,
+        bot: Bot,
+        workers: int = 8,
+        global_rate: float = GLOBAL_RATE,
+        max_retries: int = 3,
+        rate_share: float = 1.0,
+    ) -> None:
+        self.bot = bot
+        self.workers = workers
+        # Доля лимитов Telegram у этого процесса: лимиты общие на токен бота, а админ и чат отчетов
+        # получают сообщения из всех процессов, поэтому делятся и глобальный, и чатовые лимиты.
+        self.rate_share = rate_share
+        self.global_rate = global_rate * rate_share
+        self.max_retries = max_retries
+        self._tasks: list[asyncio.Task[None]] = []
+        self._chats: dict[int | str, _ChatState] = {}
+        # Очередь готовности: (момент, когда чат может отправить, порядковый номер, чат). Воркер берет
+        # ближайший готовый чат и не засыпает на лимите одного чата, пока другие могут отправлять.
+        self._ready: list[tuple[float, int, int | str]] = []
+        self._ready_seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._depth = 0
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._global_bucket: TokenBucket | None = None
+        self._paused_until = 0.0
+        self._sent = 0
+        self._failed = 0
+        self._retry_after = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._depth
+
+    @property
+    def stats(self) -> DispatcherStats:
+        return DispatcherStats(
+            queue_depth=self.queue_depth,
+            sent=self._sent,
+            failed=self._failed,
+            retry_after=self._retry_after,
+            avg_latency=self._latency_total / self._sent if self._sent else 0.0,
+            max_latency=self._latency_max,
+        )
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._global_bucket = TokenBucket(self.global_rate, self.global_rate)
+        self._tasks = [asyncio.create_task(self._worker(), name=f"message-dispatcher-{i}") for i in range(self.workers)]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._drained.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Message dispatcher stopped with %s undelivered messages", self.queue_depth)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        stats = self.stats
+        logger.info(
+            "Message dispatcher stopped: sent=%s failed=%s retry_after=%s avg_latency=%.3fs max_latency=%.3fs",
+            stats.sent,
+            stats.failed,
+            stats.retry_after,
+            stats.avg_latency,
+            stats.max_latency,
+        )
+
+    async def execute(self, method: TelegramMethod[T]) -> T:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[T] = loop.create_future()
+        key, chat = self._chat_state(getattr(method, "chat_id", None))
+        chat.pending.append(_Outgoing(method=method, future=future, enqueued_at=loop.time()))
+        self._depth += 1
+        self._drained.clear()
+        if not chat.busy and len(chat.pending) == 1:
+            self._schedule(key, chat, loop.time())
+        return await future
+
+    async def send_message(self, chat_id: int | str, text: str, **kwargs: Any) -> Message:
+        return await self.execute(SendMessage(chat_id=chat_id, text=text, **kwargs))
+
+    def _schedule(self, key: int | str, chat: _ChatState, now: float) -> None:
+        heapq.heappush(self._ready, (now + chat.bucket.delay(now), next(self._ready_seq), key))
+        self._wakeup.set()
+
+    async def _next_ready_chat(self) -> tuple[int | str, _ChatState]:
+        loop = asyncio.get_running_loop()
+        while True:
+            # Сначала сброс события, потом проверка кучи: постановка между ними не потеряет пробуждение.
+            self._wakeup.clear()
+            now = loop.time()
+            if self._ready and self._ready[0][0] <= now:
+                _, _, key = heapq.heappop(self._ready)
+                return key, self._chats[key]
+            timeout = self._ready[0][0] - now if self._ready else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            key, chat = await self._next_ready_chat()
+            # Пока сообщение чата у воркера, чата нет в очереди готовности: порядок в чате сохраняется.
+            chat.busy = True
+            item = chat.pending.popleft()
+            try:
+                # Отмененный вызывающим запрос не тратит лимит чата.
+                if not item.future.done():
+                    chat.bucket.take(loop.time())
+                    await self._deliver(item)
+            except Exception:
+                logger.exception("Unexpected error in message dispatcher worker")
+            finally:
+                now = loop.time()
+                chat.busy = False
+                chat.last_used = now
+                if chat.pending:
+                    self._schedule(key, chat, now)
+                self._depth -= 1
+                if self._depth == 0:
+                    self._drained.set()
+
+    async def _deliver(self, item: _Outgoing) -> None:
+        assert self._global_bucket is not None
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            await self._global_bucket.acquire()
+            pause = self._paused_until - loop.time()
+            if pause > 0:
+                await asyncio.sleep(pause)
+
+            try:
+                result = await self.bot(item.method)
+            except TelegramRetryAfter as exc:
+                self._retry_after += 1
+                TELEGRAM_RETRY_AFTER.inc()
+                self._paused_until = max(self._paused_until, loop.time() + exc.retry_after)
+                logger.warning("Telegram flood control: retry after %ss (attempt %s)", exc.retry_after, attempt + 1)
+                if attempt == self.max_retries:
+                    self._fail(item, exc)
+                continue
+            except Exception as exc:
+                self._fail(item, exc)
+            else:
+                latency = loop.time() - item.enqueued_at
+                self._sent += 1
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+                SEND_LATENCY_SECONDS.observe(latency)
+                if not item.future.done():
+                    item.future.set_result(result)
+            break
+
+    def _fail(self, item: _Outgoing, exc: Exception) -> None:
+        self._failed += 1
+        TELEGRAM_ERRORS.labels(type(exc).__name__).inc()
+        if not item.future.done():
+            item.future.set_exception(exc)
+
+    def _chat_state(self, chat_id: int | str | None) -> tuple[int | str, _ChatState]:
+        key = chat_id if chat_id is not None else ""
+        state = self._chats.get(key)
+        if state is not None:
+            return key, state
+
+        now = asyncio.get_running_loop().time()
+        if len(self._chats) >= 1024:
+            self._evict_idle(now)
+        is_group = isinstance(chat_id, str) or (chat_id is not None and chat_id < 0)
+        rate = (GROUP_CHAT_RATE if is_group else PRIVATE_CHAT_RATE) * self.rate_share
+        state = _ChatState(bucket=TokenBucket(rate, 1), last_used=now)
+        self._chats[key] = state
+        return key, state
+
+    def _evict_idle(self, now: float) -> None:
+        for key, state in list(self._chats.items()):
+            if not state.busy and not state.pending and now - state.last_used > IDLE_CHAT_TTL:
+                del self._chats[key]
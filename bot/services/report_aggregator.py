@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Coroutine, Iterable
+from typing import Any
+
+from bot.services.message_dispatcher import MessageDispatcher
+from bot.utils.text import TELEGRAM_MESSAGE_LIMIT, split_blocks
+
+logger = logging.getLogger(__name__)
+
+REPORT_MODES = ("immediate", "digest", "auto")
+DIGEST_SEPARATOR = "\n\n────────\n\n"
+
+
+class ReportAggregator:
+    def __init__(
+        self,
+        dispatcher: MessageDispatcher,
+        mode: str = "immediate",
+        max_reports: int = 20,
+        flush_interval: float = 60.0,
+    ) -> None:
+        if mode not in REPORT_MODES:
+            raise ValueError(f"Unsupported report mode: {mode}")
+        self.dispatcher = dispatcher
+        self.mode = mode
+        self.max_reports = max_reports
+        self.flush_interval = flush_interval
+        self._buffers: dict[int, list[str]] = {}
+        self._timers: dict[int, asyncio.Task[None]] = {}
+        self._flushes: set[asyncio.Task[None]] = set()
+
+    def is_digest(self, chat_id: int) -> bool:
+        # auto: группы (отрицательный chat_id) получают сводки из-за лимита ~20 сообщений в минуту, личка — сразу.
+        return self.mode == "digest" or (self.mode == "auto" and chat_id < 0)
+
+    def submit(self, text: str, targets: Iterable[int]) -> None:
+        # Не ждет доставки: отправка идет в фоне через диспетчер, хендлер сразу отвечает на callback.
+        immediate: list[int] = []
+        for chat_id in targets:
+            if not self.is_digest(chat_id):
+                immediate.append(chat_id)
+                continue
+            buffer = self._buffers.setdefault(chat_id, [])
+            buffer.append(text)
+            if len(buffer) >= self.max_reports:
+                timer = self._timers.pop(chat_id, None)
+                if timer is not None:
+                    timer.cancel()
+                self._spawn(self._flush_target(chat_id), f"report-digest-flush-{chat_id}")
+            elif chat_id not in self._timers:
+                self._timers[chat_id] = asyncio.create_task(self._flush_later(chat_id), name=f"report-digest-{chat_id}")
+
+        if immediate:
+            self._spawn(self._send(immediate, [text]), "report-immediate")
+
+    async def flush(self) -> None:
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        await asyncio.gather(*(self._flush_target(chat_id) for chat_id in list(self._buffers)), return_exceptions=True)
+
+    async def _flush_later(self, chat_id: int) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._timers.pop(chat_id, None)
+        self._spawn(self._flush_target(chat_id), f"report-digest-flush-{chat_id}")
+
+    def _spawn(self, coro: Coroutine[Any, Any, None], name: str) -> None:
+        task = asyncio.create_task(coro, name=name)
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush_target(self, chat_id: int) -> None:
+        reports = self._buffers.pop(chat_id, None)
+        if not reports:
+            return
+        if len(reports) == 1:
+            await self._send([chat_id], reports)
+            return
+
+        header = f"<b>📦 Сводка отчетов: {len(reports)}</b>"
+        pages = split_blocks(reports, limit=TELEGRAM_MESSAGE_LIMIT - len(header) - 2, separator=DIGEST_SEPARATOR)
+        await self._send([chat_id], [f"{header}\n\n{page}" for page in pages])
+
+    async def _send(self, targets: list[int], texts: list[str]) -> None:
+        outgoing = [(chat_id, text) for chat_id in targets for text in texts]
+        results = await asyncio.gather(
+            *(self.dispatcher.send_message(chat_id=chat_id, text=text) for chat_id, text in outgoing),
+            return_exceptions=True,
+        )
+        for (chat_id, _), result in zip(outgoing, results):
+            if isinstance(result, Exception):
+                logger.warning("Failed to deliver survey report to chat_id=%s: %s", chat_id, result)
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from bot.services.survey_service import StatsReport
+
+StatsKey = tuple[str, date, date]
+
+
+class StatsCache:
+    def __init__(self, max_size: int = 64, ttl: float = 300.0) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Растет при каждой инвалидации: отчет, посчитанный до нее, не должен попасть в кэш после.
+        self.generation = 0
+        self._entries: OrderedDict[StatsKey, tuple[StatsReport, float]] = OrderedDict()
+
+    def get(self, key: StatsKey) -> StatsReport | None:
+        entry = self._entries.get(key)
+        # TTL ограничивает расхождение с ответами, которые сохранил другой процесс.
+        if entry is None or entry[1] <= time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: StatsKey, report: StatsReport, generation: int) -> None:
+        if generation != self.generation:
+            return
+        self._entries[key] = (report, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate_date(self, day: date) -> None:
+        self.generation += 1
+        for key in [key for key in self._entries if key[1] <= day <= key[2]]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
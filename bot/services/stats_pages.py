@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+
+from bot.services.survey_service import StatsEntry, StatsReport, SurveyService
+from bot.utils.text import TELEGRAM_MESSAGE_LIMIT, split_blocks
+
+# Запас под заголовок страницы, который добавляется после разбиения.
+PAGE_HEADER_RESERVE = 256
+
+
+def format_stats_entry(entry: StatsEntry) -> str:
+    return (
+        f"👤 <b>@{entry.username}</b> (<code>{entry.user_id}</code>)\n"
+        f"• Анкет: <b>{entry.surveys_count}</b>\n"
+        f"• Настроение (avg): <b>{entry.mood_avg:.2f}</b>\n"
+        f"• Компании (avg): <b>{entry.campaigns_avg:.2f}</b>\n"
+        f"• Гео (avg): <b>{entry.geo_avg:.2f}</b>\n"
+        f"• Крео (avg): <b>{entry.creatives_avg:.2f}</b>\n"
+        f"• Кабинеты (avg): <b>{entry.accounts_avg:.2f}</b>\n"
+        f"• Эффективность (avg): <b>{entry.score_avg:.2f}</b>"
+    )
+
+
+def iter_stats_blocks(report: StatsReport) -> Iterator[str]:
+    for entry in report.per_user:
+        yield format_stats_entry(entry)
+
+    if report.overall is not None:
+        overall = report.overall
+        yield (
+            "🌐 <b>Общая статистика</b>\n"
+            f"• Анкет: <b>{overall.surveys_count}</b>\n"
+            f"• Настроение (avg): <b>{overall.mood_avg:.2f}</b>\n"
+            f"• Компании (avg): <b>{overall.campaigns_avg:.2f}</b>\n"
+            f"• Гео (avg): <b>{overall.geo_avg:.2f}</b>\n"
+            f"• Крео (avg): <b>{overall.creatives_avg:.2f}</b>\n"
+            f"• Кабинеты (avg): <b>{overall.accounts_avg:.2f}</b>\n"
+            f"• Эффективность (avg): <b>{overall.score_avg:.2f}</b>"
+        )
+
+
+def render_stats_pages(report: StatsReport, limit: int = TELEGRAM_MESSAGE_LIMIT) -> list[str]:
+    header = (
+        f"📈 <b>Статистика за {report.period}</b>\n"
+        f"Период: <b>{report.date_from}</b> — <b>{report.date_to}</b>"
+    )
+    if not report.per_user:
+        return [f"{header}\n\nНет завершенных анкет за выбранный период."]
+
+    bodies = list(split_blocks(iter_stats_blocks(report), limit=limit - PAGE_HEADER_RESERVE))
+    if len(bodies) == 1:
+        return [f"{header}\n\n{bodies[0]}"]
+    return [f"{header} · стр. {page}/{len(bodies)}\n\n{body}" for page, body in enumerate(bodies, start=1)]
+
+
+class StatsPages:
+    def __init__(self, survey_service: SurveyService) -> None:
+        self.survey_service = survey_service
+        self._rendered: dict[str, tuple[StatsReport, list[str]]] = {}
+
+    async def get(self, period: str) -> list[str]:
+        # Отчет приходит из StatsCache; пока он не инвалидирован, листание страниц не перерисовывает его.
+        report = await self.survey_service.collect_stats(period)
+        rendered = self._rendered.get(period)
+        if rendered is not None and rendered[0] is report:
+            return rendered[1]
+
+        pages = render_stats_pages(report)
+        self._rendered[period] = (report, pages)
+        return pages
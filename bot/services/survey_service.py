@@ -1,16 +1,26 @@
 from __future__ import annotations
 
+import logging
+import time
 from dataclasses import dataclass
-from datetime import date, datetime, timedelta
-from sqlalchemy import select
+from datetime import date, datetime
+from typing import Any
+
+from sqlalchemy import Row
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import async_sessionmaker
-from sqlalchemy.orm import selectinload
 
-from bot.db.models import Survey
+from bot.domain.reminders import ReminderStage, first_reminder_after
 from bot.domain.scoring import ScoringEngine, ScoreResult
+from bot.repositories.stats import StatsRepository
 from bot.repositories.surveys import SurveyRepository
 from bot.repositories.users import UserRepository
-from bot.utils.timezone import local_now_from_timezone
+from bot.services.stats_cache import StatsCache
+from bot.services.user_cache import CachedUser, UserCache
+from bot.utils.periods import period_range
+from bot.utils.timezone import NextFireTable
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass(slots=True)
@@ -18,6 +28,14 @@ class CompletionResult:
     survey_id: int
     score: ScoreResult
     completed_at: datetime
+    survey_date: date
+    telegram_user_id: int
+    username: str | None
+    mood: str
+    campaigns: int
+    geo: int
+    creatives: int
+    accounts: int
 
 
 @dataclass(slots=True)
@@ -43,11 +61,24 @@ class StatsReport:
 
 
 class SurveyService:
-    def __init__(self, session_factory: async_sessionmaker, admin_id: int, report_chat_id: int | None = None) -> None:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        user_cache: UserCache,
+        stats_cache: StatsCache,
+        admin_id: int,
+        report_chat_id: int | None = None,
+        fire_table: NextFireTable | None = None,
+        reminder_stages: tuple[ReminderStage, ...] = (),
+    ) -> None:
         self.session_factory = session_factory
+        self.user_cache = user_cache
+        self.stats_cache = stats_cache
         self.scoring_engine = ScoringEngine()
         self.admin_id = admin_id
         self.report_chat_id = report_chat_id
+        self.fire_table = fire_table or NextFireTable()
+        self.reminder_stages = reminder_stages
 
     @property
     def report_targets(self) -> list[int]:
@@ -74,122 +105,121 @@ class SurveyService:
         creatives: int,
         accounts: int,
     ) -> CompletionResult | None:
+        started = time.perf_counter()
         async with self.session_factory() as session:
             repo = SurveyRepository(session)
             async with session.begin():
-                survey = await repo.get_pending_by_id(survey_id)
-                if survey is None:
+                completed = await repo.complete_pending(survey_id, mood, campaigns, geo, creatives, accounts)
+                if completed is None:
                     return None
                 score = self.scoring_engine.score(mood, campaigns, geo, creatives, accounts)
-                updated = await repo.save_answer(survey, mood, campaigns, geo, creatives, accounts)
-                completed_at = updated.completed_at or datetime.utcnow()
-                return CompletionResult(survey_id=updated.id, score=score, completed_at=completed_at)
-
-    async def get_full_survey(self, survey_id: int) -> Survey | None:
-        async with self.session_factory() as session:
-            result = await session.execute(
-                select(Survey)
-                .options(selectinload(Survey.user), selectinload(Survey.answer))
-                .where(Survey.id == survey_id)
-            )
-            return result.scalar_one_or_none()
+                stats_repo = StatsRepository(session)
+                await stats_repo.add_answer(
+                    user_db_id=completed.user_id,
+                    survey_date=completed.date,
+                    mood=mood,
+                    campaigns_count=campaigns,
+                    geo_count=geo,
+                    creatives_count=creatives,
+                    accounts_count=accounts,
+                    score_average=score.average,
+                )
+                await stats_repo.notify_invalidate(completed.date)
+
+        self.stats_cache.invalidate_date(completed.date)
+        logger.info("Survey completed survey_id=%s in %.1fms", survey_id, (time.perf_counter() - started) * 1000)
+        return CompletionResult(
+            survey_id=completed.id,
+            score=score,
+            completed_at=completed.completed_at,
+            survey_date=completed.date,
+            telegram_user_id=completed.telegram_user_id,
+            username=completed.username,
+            mood=mood,
+            campaigns=campaigns,
+            geo=geo,
+            creatives=creatives,
+            accounts=accounts,
+        )
 
     async def get_or_create_today_survey_for_user(self, telegram_user_id: int) -> int | None:
         async with self.session_factory() as session:
             user_repo = UserRepository(session)
             survey_repo = SurveyRepository(session)
 
-            async with session.begin():
-                user = await user_repo.get_by_telegram_id(telegram_user_id)
-                if user is None:
-                    return None
-
-                local_now = local_now_from_timezone(user.timezone)
-                survey, _ = await survey_repo.create_daily_if_absent(user_db_id=user.id, survey_date=local_now.date())
-                if survey.status.value != "pending":
-                    return None
-
-                return survey.id
+            try:
+                async with session.begin():
+                    user = self.user_cache.get(telegram_user_id)
+                    if user is None:
+                        stored = await user_repo.get_by_telegram_id(telegram_user_id)
+                        if stored is None:
+                            return None
+                        user = CachedUser(
+                            id=stored.id,
+                            user_id=stored.user_id,
+                            username=stored.username,
+                            timezone=stored.timezone,
+                            send_time=stored.send_time,
+                        )
+                        self.user_cache.put(user)
+
+                    local_date = self.fire_table.local_date(user.timezone)
+                    survey, _ = await survey_repo.create_daily_if_absent(
+                        user_db_id=user.id,
+                        survey_date=local_date,
+                        first_reminder_after=first_reminder_after(self.reminder_stages),
+                    )
+                    if survey.status.value != "pending":
+                        return None
+
+                    return survey.id
+            except IntegrityError:
+                # Пользователя удалили в другом процессе, а NOTIFY о сбросе кэша еще не дошел: users.id уже нет.
+                self.user_cache.invalidate(telegram_user_id)
+                logger.info("Skipped survey for removed user telegram_user_id=%s", telegram_user_id)
+                return None
 
     async def collect_stats(self, period: str) -> StatsReport:
-        days = {"day": 1, "week": 7, "month": 30}.get(period, 1)
-        date_to = datetime.utcnow().date()
-        date_from = date_to - timedelta(days=days - 1)
+        date_from, date_to = period_range(period)
+        key = (period, date_from, date_to)
+        cached = self.stats_cache.get(key)
+        if cached is not None:
+            return cached
 
+        generation = self.stats_cache.generation
         async with self.session_factory() as session:
-            repo = SurveyRepository(session)
-            surveys = await repo.list_answered_in_range(date_from, date_to)
-
-        grouped: dict[int, list[Survey]] = {}
-        for survey in surveys:
-            if survey.user is None or survey.answer is None:
-                continue
-            grouped.setdefault(survey.user.user_id, []).append(survey)
-
-        entries: list[StatsEntry] = []
-        for user_id, user_surveys in grouped.items():
-            entries.append(self._build_stats_entry(user_surveys, user_id=user_id))
-
-        entries.sort(key=lambda x: x.user_id)
-        overall = self._build_stats_entry(surveys, user_id=0, username_override="Общая статистика") if surveys else None
+            repo = StatsRepository(session)
+            per_user_rows = await repo.stats_by_user_in_range(date_from, date_to)
+            overall_row = await repo.stats_overall_in_range(date_from, date_to)
+
+        entries = [self._stats_entry_from_row(row, user_id=row.user_id, username=row.username or "-") for row in per_user_rows]
+        overall = (
+            self._stats_entry_from_row(overall_row, user_id=0, username="Общая статистика")
+            if overall_row.surveys_count
+            else None
+        )
 
-        return StatsReport(
+        report = StatsReport(
             period=period,
             date_from=date_from,
             date_to=date_to,
             per_user=entries,
             overall=overall,
         )
+        self.stats_cache.put(key, report, generation)
+        return report
 
-    def _build_stats_entry(
-        self,
-        surveys: list[Survey],
-        user_id: int,
-        username_override: str | None = None,
-    ) -> StatsEntry:
-        answers = [s.answer for s in surveys if s.answer is not None]
-        if not answers:
-            return StatsEntry(
-                username=username_override or "-",
-                user_id=user_id,
-                surveys_count=0,
-                mood_avg=0.0,
-                campaigns_avg=0.0,
-                geo_avg=0.0,
-                creatives_avg=0.0,
-                accounts_avg=0.0,
-                score_avg=0.0,
-            )
-
-        mood_map = {"🟢": 2.0, "🟡": 1.0, "🔴": 0.0}
-        mood_avg = sum(mood_map.get(a.mood, 0.0) for a in answers) / len(answers)
-        campaigns_avg = sum(a.campaigns_count for a in answers) / len(answers)
-        geo_avg = sum(a.geo_count for a in answers) / len(answers)
-        creatives_avg = sum(a.creatives_count for a in answers) / len(answers)
-        accounts_avg = sum(a.accounts_count for a in answers) / len(answers)
-
-        score_values = [
-            self.scoring_engine.score(a.mood, a.campaigns_count, a.geo_count, a.creatives_count, a.accounts_count).average
-            for a in answers
-        ]
-        score_avg = sum(score_values) / len(score_values)
-
-        first_with_user = next((s for s in surveys if s.user is not None), None)
-        username = username_override
-        if username is None:
-            if first_with_user is None:
-                username = "-"
-            else:
-                username = first_with_user.user.username or "-"
-
+    @staticmethod
+    def _stats_entry_from_row(row: Row[Any], user_id: int, username: str) -> StatsEntry:
+        count = row.surveys_count or 1
         return StatsEntry(
             username=username,
             user_id=user_id,
-            surveys_count=len(answers),
-            mood_avg=mood_avg,
-            campaigns_avg=campaigns_avg,
-            geo_avg=geo_avg,
-            creatives_avg=creatives_avg,
-            accounts_avg=accounts_avg,
-            score_avg=score_avg,
+            surveys_count=row.surveys_count,
+            mood_avg=float(row.mood_sum) / count,
+            campaigns_avg=float(row.campaigns_sum) / count,
+            geo_avg=float(row.geo_sum) / count,
+            creatives_avg=float(row.creatives_sum) / count,
+            accounts_avg=float(row.accounts_sum) / count,
+            score_avg=float(row.score_sum) / count,
         )
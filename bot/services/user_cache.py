@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import time as dt_time
+
+
+@dataclass(frozen=True, slots=True)
+class CachedUser:
+    id: int
+    user_id: int
+    username: str | None
+    timezone: str
+    send_time: dt_time | None = None
+
+
+class UserCache:
+    def __init__(self, max_size: int = 10_000, ttl: float = 600.0) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, tuple[CachedUser, float]] = OrderedDict()
+
+    def get(self, telegram_user_id: int) -> CachedUser | None:
+        entry = self._entries.get(telegram_user_id)
+        # TTL ограничивает расхождение с БД, если пользователя поменял другой процесс.
+        if entry is None or entry[1] <= time.monotonic():
+            self._entries.pop(telegram_user_id, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(telegram_user_id)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, user: CachedUser) -> None:
+        self._entries[user.user_id] = (user, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user.user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_user_id: int) -> None:
+        self._entries.pop(telegram_user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -1,20 +1,53 @@
 from __future__ import annotations
 
+from datetime import time
+
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
+from bot.repositories.stats import StatsRepository
 from bot.repositories.users import UserRepository
-from bot.utils.timezone import normalize_timezone_input
+from bot.services.stats_cache import StatsCache
+from bot.services.user_cache import CachedUser, UserCache
+from bot.utils.timezone import SURVEY_TIME, normalize_send_time_input, normalize_timezone_input
 
 
 class UserService:
-    def __init__(self, session_factory: async_sessionmaker) -> None:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        user_cache: UserCache,
+        stats_cache: StatsCache,
+        default_send_time: time = SURVEY_TIME,
+    ) -> None:
         self.session_factory = session_factory
+        self.user_cache = user_cache
+        self.stats_cache = stats_cache
+        self.default_send_time = default_send_time
+
+    def effective_send_time(self, user: CachedUser) -> time:
+        return user.send_time if user.send_time is not None else self.default_send_time
+
+    async def register(self, telegram_user_id: int, username: str | None) -> CachedUser:
+        cached = self.user_cache.get(telegram_user_id)
+        if cached is not None and cached.username == username:
+            return cached
 
-    async def register(self, telegram_user_id: int, username: str | None) -> None:
         async with self.session_factory() as session:
             repo = UserRepository(session)
             async with session.begin():
-                await repo.create_or_update(telegram_user_id, username)
+                user, inserted = await repo.upsert(telegram_user_id, username)
+                # Расписание меняется только у нового пользователя: смена username слот не затрагивает.
+                if inserted:
+                    await repo.notify_schedule_change((user.timezone, user.send_time))
+                cached = CachedUser(
+                    id=user.id,
+                    user_id=user.user_id,
+                    username=user.username,
+                    timezone=user.timezone,
+                    send_time=user.send_time,
+                )
+        self.user_cache.put(cached)
+        return cached
 
     async def set_timezone(self, telegram_user_id: int, timezone: str) -> str | None:
         normalized_timezone = normalize_timezone_input(timezone)
@@ -24,11 +57,48 @@ class UserService:
         async with self.session_factory() as session:
             repo = UserRepository(session)
             async with session.begin():
-                await repo.set_timezone(telegram_user_id, normalized_timezone)
+                previous = await repo.set_timezone(telegram_user_id, normalized_timezone)
+                if previous is not None and previous[0] != normalized_timezone:
+                    await repo.notify_schedule_change((normalized_timezone, previous[1]), previous)
+                    await repo.notify_invalidate(telegram_user_id)
+        self.user_cache.invalidate(telegram_user_id)
         return normalized_timezone
 
+    async def set_send_time(self, telegram_user_id: int, value: str) -> time | None:
+        # "default" возвращает пользователя к времени команды.
+        if value.strip().lower() == "default":
+            send_time = None
+        else:
+            send_time = normalize_send_time_input(value)
+            if send_time is None:
+                return None
+
+        async with self.session_factory() as session:
+            repo = UserRepository(session)
+            async with session.begin():
+                previous = await repo.set_send_time(telegram_user_id, send_time)
+                if previous is not None and previous[1] != send_time:
+                    await repo.notify_schedule_change((previous[0], send_time), previous)
+                    await repo.notify_invalidate(telegram_user_id)
+        self.user_cache.invalidate(telegram_user_id)
+        return send_time if send_time is not None else self.default_send_time
+
     async def remove_user(self, telegram_user_id: int) -> bool:
         async with self.session_factory() as session:
             repo = UserRepository(session)
             async with session.begin():
-                return await repo.delete_by_telegram_id(telegram_user_id)
+                stats_repo = StatsRepository(session)
+                await stats_repo.subtract_user(telegram_user_id)
+                removed_schedule = await repo.delete_by_telegram_id(telegram_user_id)
+                removed = removed_schedule is not None
+                if removed:
+                    await repo.notify_schedule_change(None, removed_schedule)
+                    # Чат удаленного пользователя может обслуживать другой воркер: его кэш тоже сбрасывается,
+                    # иначе /result создал бы анкету по уже удаленному users.id.
+                    await repo.notify_invalidate(telegram_user_id)
+                    await stats_repo.notify_invalidate()
+        self.user_cache.invalidate(telegram_user_id)
+        if removed:
+            # Вклад пользователя вычтен из всех дней, поэтому сбрасываем отчеты целиком.
+            self.stats_cache.clear()
+        return removed
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from bot.repositories.fsm import FsmRepository
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class _CachedRecord:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    expires_at: float = 0.0
+
+
+class PostgresStorage(BaseStorage):
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        key_builder: KeyBuilder | None = None,
+        cache_ttl: float = 900.0,
+        cache_size: int = 10_000,
+        flush_delay: float = 0.05,
+    ) -> None:
+        self.session_factory = session_factory
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.flush_delay = flush_delay
+        self._cache: OrderedDict[str, _CachedRecord] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._flushing: set[str] = set()
+        self._flush_task: asyncio.Task[None] | None = None
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key)
+        record = await self._record(storage_key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(storage_key)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        record = await self._record(self.key_builder.build(key))
+        return record.state
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        storage_key = self.key_builder.build(key)
+        record = await self._record(storage_key)
+        record.data = data.copy()
+        self._mark_dirty(storage_key)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        record = await self._record(self.key_builder.build(key))
+        return record.data.copy()
+
+    async def close(self) -> None:
+        # Идущую запись дожидаемся, а не отменяем: ее ключи уже вынуты из _dirty.
+        if self._flush_task is not None and not self._flush_task.done():
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
+
+    async def flush(self) -> None:
+        if not self._dirty:
+            return
+        keys = list(self._dirty)
+        self._dirty.clear()
+        self._flushing.update(keys)
+
+        upserts: dict[str, tuple[str | None, dict[str, Any]]] = {}
+        deletes: list[str] = []
+        for storage_key in keys:
+            record = self._cache[storage_key]
+            if record.state is None and not record.data:
+                deletes.append(storage_key)
+            else:
+                upserts[storage_key] = (record.state, record.data.copy())
+
+        try:
+            async with self.session_factory() as session:
+                repo = FsmRepository(session)
+                async with session.begin():
+                    await repo.upsert_many(upserts)
+                    await repo.delete_many(deletes)
+        except asyncio.CancelledError:
+            # Отмена посреди записи не должна терять состояние: ключи снова ждут следующего flush.
+            self._dirty.update(keys)
+            raise
+        except Exception:
+            logger.exception("Failed to flush %s FSM records, will retry", len(keys))
+            self._dirty.update(keys)
+            self._schedule_flush()
+        finally:
+            self._flushing.difference_update(keys)
+
+    async def _record(self, storage_key: str) -> _CachedRecord:
+        now = time.monotonic()
+        record = self._cache.get(storage_key)
+        if record is not None and (record.expires_at > now or self._is_pinned(storage_key)):
+            record.expires_at = now + self.cache_ttl
+            self._cache.move_to_end(storage_key)
+            return record
+
+        async with self.session_factory() as session:
+            stored = await FsmRepository(session).get(storage_key)
+
+        # Пока шел SELECT, запись могла появиться в кэше из другого апдейта — она свежее БД.
+        record = self._cache.get(storage_key)
+        if record is None or not self._is_pinned(storage_key):
+            record = _CachedRecord()
+            if stored is not None:
+                record.state = stored.state
+                record.data = dict(stored.data or {})
+        record.expires_at = now + self.cache_ttl
+        self._cache[storage_key] = record
+        self._cache.move_to_end(storage_key)
+        self._evict()
+        return record
+
+    def _mark_dirty(self, storage_key: str) -> None:
+        # state и data одного шага хендлера копятся и уходят в БД одним UPSERT.
+        self._dirty.add(storage_key)
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        await self.flush()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for storage_key in list(self._cache):
+            if len(self._cache) <= self.cache_size:
+                break
+            if not self._is_pinned(storage_key):
+                del self._cache[storage_key]
+        for storage_key, record in list(self._cache.items()):
+            if record.expires_at > now:
+                break
+            if not self._is_pinned(storage_key):
+                del self._cache[storage_key]
+
+    def _is_pinned(self, storage_key: str) -> bool:
+        # Несохраненные записи нельзя вытеснять и перечитывать из БД.
+        return storage_key in self._dirty or storage_key in self._flushing
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import functools
+import inspect
+import logging
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+from aiogram import BaseMiddleware, Router
+from aiogram.types import TelegramObject
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED, JobEvent, JobSubmissionEvent
+from apscheduler.schedulers.base import BaseScheduler
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0)
+
+HANDLER_SECONDS = Histogram("bot_handler_seconds", "Update handler latency", ["handler"], buckets=LATENCY_BUCKETS)
+HANDLER_ERRORS = Counter("bot_handler_errors_total", "Update handlers that raised", ["handler"])
+DB_CALL_SECONDS = Histogram("bot_db_call_seconds", "Repository method latency", ["method"], buckets=LATENCY_BUCKETS)
+DB_STATEMENTS = Counter("bot_db_statements_total", "SQL statements executed", ["method"])
+JOB_SECONDS = Histogram("bot_scheduler_job_seconds", "Scheduler job run time", ["job"], buckets=LATENCY_BUCKETS)
+JOB_LAG_SECONDS = Histogram("bot_scheduler_job_lag_seconds", "Actual minus scheduled job start", ["job"], buckets=LAG_BUCKETS)
+JOB_RUNS = Counter("bot_scheduler_job_runs_total", "Scheduler job outcomes", ["job", "outcome"])
+SEND_QUEUE_DEPTH = Gauge("bot_send_queue_depth", "Outgoing Telegram requests waiting in the dispatcher queue")
+SEND_LATENCY_SECONDS = Histogram("bot_send_seconds", "Time from enqueue to Telegram response", buckets=LATENCY_BUCKETS)
+TELEGRAM_ERRORS = Counter("bot_telegram_errors_total", "Telegram API requests that failed", ["error"])
+TELEGRAM_RETRY_AFTER = Counter("bot_telegram_retry_after_total", "Telegram flood control responses")
+
+# Метод репозитория, внутри которого выполняется SQL: по нему размечаются счетчики запросов.
+_current_method: ContextVar[str] = ContextVar("current_repository_method", default="other")
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0") -> None:
+    # Экспозиция считается только на scrape; без запросов к порту стоимость — инкременты счетчиков.
+    start_http_server(port, addr=host)
+    logger.info("Metrics endpoint listening on %s:%s/metrics", host, port)
+
+
+def instrument_repository(cls: type[T]) -> type[T]:
+    for name, attribute in list(vars(cls).items()):
+        if name.startswith("_"):
+            continue
+        label = f"{cls.__name__}.{name}"
+        if inspect.isasyncgenfunction(attribute):
+            setattr(cls, name, _timed_generator(label, attribute))
+        elif inspect.iscoroutinefunction(attribute):
+            setattr(cls, name, _timed_coroutine(label, attribute))
+    return cls
+
+
+def _timed_coroutine(label: str, func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    histogram = DB_CALL_SECONDS.labels(label)
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        token = _current_method.set(label)
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - started)
+            _current_method.reset(token)
+
+    return wrapper
+
+
+def _timed_generator(label: str, func: Callable[..., AsyncIterator[Any]]) -> Callable[..., AsyncIterator[Any]]:
+    histogram = DB_CALL_SECONDS.labels(label)
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        # Время генератора — только ожидание очередной порции из БД, без обработки порций вызывающим кодом.
+        iterator = func(*args, **kwargs).__aiter__()
+        elapsed = 0.0
+        try:
+            while True:
+                token = _current_method.set(label)
+                started = time.perf_counter()
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - started
+                    _current_method.reset(token)
+                yield item
+        finally:
+            await iterator.aclose()
+            histogram.observe(elapsed)
+
+    return wrapper
+
+
+def count_statements(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _on_statement)
+
+
+def _on_statement(*_: Any) -> None:
+    DB_STATEMENTS.labels(_current_method.get()).inc()
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.labels(name).inc()
+            raise
+        finally:
+            HANDLER_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+
+def instrument_router(router: Router) -> None:
+    # Inner-middleware видит выбранный хендлер и наследуется вложенными роутерами.
+    middleware = HandlerMetricsMiddleware()
+    router.message.middleware(middleware)
+    router.callback_query.middleware(middleware)
+
+
+class SchedulerMetrics:
+    def __init__(self) -> None:
+        self._started: dict[str, float] = {}
+
+    def attach(self, scheduler: BaseScheduler) -> None:
+        scheduler.add_listener(self._on_submitted, EVENT_JOB_SUBMITTED)
+        scheduler.add_listener(self._on_finished, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED)
+
+    @staticmethod
+    def job_label(job_id: str) -> str:
+        # У отложенных рассылок id содержит момент запуска; в метке оставляем только тип job.
+        return job_id.split(":", 1)[0]
+
+    def _on_submitted(self, event: JobSubmissionEvent) -> None:
+        now = time.time()
+        self._started[event.job_id] = time.perf_counter()
+        if event.scheduled_run_times:
+            lag = now - event.scheduled_run_times[-1].timestamp()
+            JOB_LAG_SECONDS.labels(self.job_label(event.job_id)).observe(max(lag, 0.0))
+
+    def _on_finished(self, event: JobEvent) -> None:
+        label = self.job_label(event.job_id)
+        if event.code == EVENT_JOB_MISSED:
+            JOB_RUNS.labels(label, "missed").inc()
+            return
+        started = self._started.pop(event.job_id, None)
+        if started is not None:
+            JOB_SECONDS.labels(label).observe(time.perf_counter() - started)
+        JOB_RUNS.labels(label, "error" if event.code == EVENT_JOB_ERROR else "ok").inc()
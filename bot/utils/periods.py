@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+
+PERIOD_DAYS = {"day": 1, "week": 7, "month": 30}
+
+
+def period_range(period: str) -> tuple[date, date]:
+    days = PERIOD_DAYS.get(period, 1)
+    date_to = datetime.utcnow().date()
+    date_from = date_to - timedelta(days=days - 1)
+    return date_from, date_to
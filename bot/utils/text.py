@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+
+# Лимит Telegram Bot API на длину текста одного сообщения.
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+def split_blocks(blocks: Iterable[str], limit: int = TELEGRAM_MESSAGE_LIMIT, separator: str = "\n\n") -> Iterator[str]:
+    # Склеивает блоки в сообщения не длиннее limit, не разрывая блок; блоки читаются лениво.
+    # Блок длиннее лимита (не бывает для отчетов бота, но не должен ронять отправку) режется по строкам.
+    current: list[str] = []
+    size = 0
+    for block in blocks:
+        for part in _fit(block, limit):
+            extra = len(part) + (len(separator) if current else 0)
+            if current and size + extra > limit:
+                yield separator.join(current)
+                current, size = [], 0
+                extra = len(part)
+            current.append(part)
+            size += extra
+    if current:
+        yield separator.join(current)
+
+
+def _fit(block: str, limit: int) -> Iterator[str]:
+    if len(block) <= limit:
+        yield block
+        return
+    line_buffer = ""
+    for line in block.split("\n"):
+        while len(line) > limit:
+            if line_buffer:
+                yield line_buffer
+                line_buffer = ""
+            yield line[:limit]
+            line = line[limit:]
+        candidate = f"{line_buffer}\n{line}" if line_buffer else line
+        if len(candidate) > limit:
+            yield line_buffer
+            candidate = line
+        line_buffer = candidate
+    if line_buffer:
+        yield line_buffer
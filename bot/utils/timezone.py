@@ -1,10 +1,17 @@
 from __future__ import annotations
 
 import re
-from datetime import datetime, timedelta, timezone
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 OFFSET_RE = re.compile(r"^[+-](?:[0-9]|1[0-4])$")
+SEND_TIME_RE = re.compile(r"^([01]?[0-9]|2[0-3]):([0-5][0-9])$")
+SURVEY_TIME = time(hour=20, minute=0)
+# Время рассылки кратно 15 минутам (как и смещения таймзон), поэтому различных
+# UTC-моментов запуска в сутках не больше 96, сколько бы ни было пользователей.
+SEND_TIME_STEP_MINUTES = 15
 
 
 def normalize_timezone_input(value: str) -> str | None:
@@ -22,12 +29,65 @@ def normalize_timezone_input(value: str) -> str | None:
     return candidate
 
 
+def normalize_send_time_input(value: str) -> time | None:
+    match = SEND_TIME_RE.fullmatch(value.strip())
+    if match is None:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if minute % SEND_TIME_STEP_MINUTES:
+        return None
+    return time(hour=hour, minute=minute)
+
+
+@lru_cache(maxsize=1024)
 def tzinfo_from_stored(value: str) -> timezone | ZoneInfo:
+    # Различных значений в базе — не больше числа IANA-зон и смещений, поэтому кэш ограничен с запасом.
     if value.startswith("UTC+") or value.startswith("UTC-"):
         hours = int(value.split("UTC", maxsplit=1)[1])
         return timezone(timedelta(hours=hours))
     return ZoneInfo(value)
 
 
-def local_now_from_timezone(value: str) -> datetime:
-    return datetime.now(tz=timezone.utc).astimezone(tzinfo_from_stored(value))
+@dataclass(frozen=True, slots=True)
+class FireSlot:
+    local_date: date
+    target_date: date
+    fire_at: datetime
+    valid_until: datetime
+
+
+class NextFireTable:
+    def __init__(self, fire_time: time = SURVEY_TIME) -> None:
+        self.fire_time = fire_time
+        self._slots: dict[tuple[str, time], FireSlot] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def get(self, value: str, now_utc: datetime | None = None, fire_time: time | None = None) -> FireSlot:
+        if now_utc is None:
+            now_utc = datetime.now(tz=timezone.utc)
+        key = (value, fire_time if fire_time is not None else self.fire_time)
+        slot = self._slots.get(key)
+        if slot is None or now_utc >= slot.valid_until:
+            slot = self._compute(value, key[1], now_utc)
+            self._slots[key] = slot
+        return slot
+
+    def local_date(self, value: str, now_utc: datetime | None = None) -> date:
+        return self.get(value, now_utc).local_date
+
+    @staticmethod
+    def _compute(value: str, fire_time: time, now_utc: datetime) -> FireSlot:
+        tz = tzinfo_from_stored(value)
+        local_date = now_utc.astimezone(tz).date()
+        today_fire = datetime.combine(local_date, fire_time, tzinfo=tz).astimezone(timezone.utc)
+        next_midnight = datetime.combine(local_date + timedelta(days=1), time(), tzinfo=tz).astimezone(timezone.utc)
+
+        # Слот меняется только на границе локальных суток или в момент рассылки; переходы DST
+        # учтены, так как обе границы пересчитываются через правила зоны.
+        if now_utc < today_fire:
+            return FireSlot(local_date, local_date, today_fire, min(today_fire, next_midnight))
+        target_date = local_date + timedelta(days=1)
+        fire_at = datetime.combine(target_date, fire_time, tzinfo=tz).astimezone(timezone.utc)
+        return FireSlot(local_date, target_date, fire_at, next_midnight)
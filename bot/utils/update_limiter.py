@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def routing_key(update: dict[str, Any]) -> int:
+    # Ключ — чат апдейта (или отправитель, если чата нет): по нему сохраняется порядок и шардирование по воркерам.
+    for event in update.values():
+        if not isinstance(event, dict):
+            continue
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if isinstance(chat, dict) and "id" in chat:
+            return int(chat["id"])
+        sender = event.get("from") or event.get("user")
+        if isinstance(sender, dict) and "id" in sender:
+            return int(sender["id"])
+    return int(update.get("update_id", 0))
+
+
+class UpdateLimiter:
+    def __init__(self, max_concurrency: int, max_pending: int | None = None) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending or max_concurrency * 16
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._key_refs: dict[int, int] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._has_capacity = asyncio.Event()
+        self._has_capacity.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def try_submit(self, key: int, handler: Callable[[], Awaitable[Any]]) -> bool:
+        if len(self._tasks) >= self.max_pending:
+            return False
+
+        self._key_refs[key] = self._key_refs.get(key, 0) + 1
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        task = asyncio.create_task(self._run(key, lock, handler))
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+        if len(self._tasks) >= self.max_pending:
+            self._has_capacity.clear()
+        return True
+
+    async def submit(self, key: int, handler: Callable[[], Awaitable[Any]]) -> None:
+        while not self.try_submit(key, handler):
+            await self._has_capacity.wait()
+
+    async def drain(self, timeout: float = 30.0) -> None:
+        if not self._tasks:
+            return
+        logger.info("Draining %s in-flight updates...", len(self._tasks))
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        if pending:
+            logger.warning("Cancelling %s updates that did not finish within %ss", len(pending), timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _run(self, key: int, lock: asyncio.Lock, handler: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            # Сначала лок чата (порядок апдейтов одного чата), потом общий слот — ожидающий чат не занимает слот.
+            async with lock:
+                async with self._semaphore:
+                    await handler()
+        except Exception:
+            logger.exception("Failed to process update for key=%s", key)
+        finally:
+            refs = self._key_refs[key] - 1
+            if refs:
+                self._key_refs[key] = refs
+            else:
+                del self._key_refs[key]
+                del self._locks[key]
+
+    def _on_done(self, task: asyncio.Task[None]) -> None:
+        self._tasks.discard(task)
+        if len(self._tasks) < self.max_pending:
+            self._has_capacity.set()
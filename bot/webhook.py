@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import signal
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+
+from aiohttp import web
+
+from bot.app import create_application
+from bot.config.settings import Settings
+from bot.utils.update_limiter import UpdateLimiter, routing_key
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def create_webhook_app(settings: Settings, accept: Callable[[dict[str, Any]], bool]) -> web.Application:
+    async def handle_update(request: web.Request) -> web.Response:
+        if settings.webhook_secret and request.headers.get(SECRET_HEADER) != settings.webhook_secret:
+            return web.Response(status=401)
+        try:
+            update = await request.json()
+        except json.JSONDecodeError:
+            return web.Response(status=400)
+        if not isinstance(update, dict):
+            return web.Response(status=400)
+
+        # Отвечаем сразу, обработка идет в фоне; 503 — Telegram повторит доставку позже.
+        if not accept(update):
+            return web.Response(status=503)
+        return web.Response()
+
+    web_app = web.Application()
+    web_app.router.add_post(settings.webhook_path, handle_update)
+    return web_app
+
+
+def stop_event_on_signals() -> asyncio.Event:
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    return stopping
+
+
+async def serve(web_app: web.Application, settings: Settings, stopping: asyncio.Event) -> None:
+    runner = web.AppRunner(web_app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.webhook_host, port=settings.webhook_port)
+    await site.start()
+    logger.info("Webhook server listening on %s:%s%s", settings.webhook_host, settings.webhook_port, settings.webhook_path)
+    try:
+        await stopping.wait()
+    finally:
+        # Перестаем принимать новые апдейты до того, как дожидаемся уже принятых.
+        await runner.cleanup()
+
+
+async def run_webhook(settings: Settings) -> None:
+    app = create_application(settings)
+    limiter = UpdateLimiter(settings.max_concurrent_updates)
+    workflow_data = {"dispatcher": app.dp, "bots": [app.bot], **app.dp.workflow_data}
+
+    def accept(update: dict[str, Any]) -> bool:
+        return limiter.try_submit(routing_key(update), partial(app.dp.feed_raw_update, app.bot, update))
+
+    stopping = stop_event_on_signals()
+    await app.dp.emit_startup(bot=app.bot, **workflow_data)
+    try:
+        await app.bot.set_webhook(
+            url=settings.webhook_url,
+            secret_token=settings.webhook_secret,
+            allowed_updates=app.dp.resolve_used_update_types(),
+        )
+        await serve(create_webhook_app(settings, accept), settings, stopping)
+    finally:
+        await limiter.drain()
+        await app.dp.emit_shutdown(bot=app.bot, **workflow_data)
+        await app.bot.session.close()
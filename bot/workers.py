@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import queue as queue_errors
+import signal
+from functools import partial
+from multiprocessing.context import SpawnContext, SpawnProcess
+from multiprocessing.queues import Queue
+from typing import Any
+
+from aiogram import Bot
+
+from bot.app import create_application, create_bot, setup_logging
+from bot.config.settings import Settings, get_settings
+from bot.handlers import ALLOWED_UPDATES
+from bot.utils.update_limiter import UpdateLimiter, routing_key
+from bot.webhook import create_webhook_app, serve, stop_event_on_signals
+
+logger = logging.getLogger(__name__)
+
+POLLING_TIMEOUT = 25
+WORKER_QUEUE_SIZE = 10_000
+
+
+def worker_process(index: int, updates: Queue[dict[str, Any] | None]) -> None:
+    # Ctrl+C приходит всей группе процессов; воркер останавливается по сигналу супервизора.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_logging()
+    asyncio.run(_worker_main(index, updates))
+
+
+async def _worker_main(index: int, updates: Queue[dict[str, Any] | None]) -> None:
+    settings = get_settings()
+    app = create_application(settings, worker_index=index)
+    limiter = UpdateLimiter(settings.max_concurrent_updates)
+    workflow_data = {"dispatcher": app.dp, "bots": [app.bot], **app.dp.workflow_data}
+    await app.dp.emit_startup(bot=app.bot, **workflow_data)
+    logger.info("Worker %s ready", index)
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            update = await loop.run_in_executor(None, updates.get)
+            if update is None:
+                break
+            await limiter.submit(routing_key(update), partial(app.dp.feed_raw_update, app.bot, update))
+    finally:
+        await limiter.drain()
+        await app.dp.emit_shutdown(bot=app.bot, **workflow_data)
+        await app.bot.session.close()
+        logger.info("Worker %s stopped", index)
+
+
+class _WorkerPool:
+    def __init__(self, size: int) -> None:
+        self.ctx: SpawnContext = multiprocessing.get_context("spawn")
+        self.queues: list[Queue[dict[str, Any] | None]] = [self.ctx.Queue(maxsize=WORKER_QUEUE_SIZE) for _ in range(size)]
+        self.processes: list[SpawnProcess] = [self._spawn(index) for index in range(size)]
+
+    def _spawn(self, index: int) -> SpawnProcess:
+        process = self.ctx.Process(target=worker_process, args=(index, self.queues[index]), name=f"bot-worker-{index}")
+        process.start()
+        logger.info("Spawned worker %s pid=%s", index, process.pid)
+        return process
+
+    def queue_for(self, update: dict[str, Any]) -> Queue[dict[str, Any] | None]:
+        # Все апдейты одного чата идут в один воркер: сохраняется порядок шагов анкеты и горячий кэш FSM.
+        return self.queues[routing_key(update) % len(self.queues)]
+
+    def restart_dead(self) -> None:
+        for index, process in enumerate(self.processes):
+            if not process.is_alive():
+                logger.warning("Worker %s exited with code %s, restarting", index, process.exitcode)
+                self.processes[index] = self._spawn(index)
+
+    async def stop(self) -> None:
+        logger.info("Stopping workers...")
+        loop = asyncio.get_running_loop()
+        for queue in self.queues:
+            queue.put(None)
+        for process in self.processes:
+            await loop.run_in_executor(None, process.join, 30)
+            if process.is_alive():
+                process.terminate()
+
+
+async def _poll_updates(bot: Bot, pool: _WorkerPool, allowed_updates: list[str], stopping: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    stop_waiter = asyncio.create_task(stopping.wait())
+    offset: int | None = None
+    await bot.delete_webhook()
+    try:
+        while not stopping.is_set():
+            pool.restart_dead()
+            polling = asyncio.create_task(
+                bot.get_updates(offset=offset, timeout=POLLING_TIMEOUT, allowed_updates=allowed_updates)
+            )
+            await asyncio.wait({polling, stop_waiter}, return_when=asyncio.FIRST_COMPLETED)
+            if not polling.done():
+                polling.cancel()
+                break
+            try:
+                updates = polling.result()
+            except Exception:
+                logger.exception("Failed to fetch updates")
+                await asyncio.sleep(1)
+                continue
+
+            for update in updates:
+                raw = update.model_dump(mode="json", by_alias=True, exclude_unset=True)
+                # Блокирующий put дает backpressure, если воркер не успевает.
+                await loop.run_in_executor(None, pool.queue_for(raw).put, raw)
+                offset = update.update_id + 1
+    finally:
+        stop_waiter.cancel()
+
+
+async def _watch_workers(pool: _WorkerPool, stopping: asyncio.Event) -> None:
+    while not stopping.is_set():
+        pool.restart_dead()
+        try:
+            await asyncio.wait_for(stopping.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_supervisor(settings: Settings) -> None:
+    pool = _WorkerPool(settings.workers)
+    stopping = stop_event_on_signals()
+    bot = create_bot(settings)
+    allowed_updates = ALLOWED_UPDATES
+
+    try:
+        if settings.webhook_url:
+            def accept(update: dict[str, Any]) -> bool:
+                try:
+                    pool.queue_for(update).put_nowait(update)
+                except queue_errors.Full:
+                    return False
+                return True
+
+            await bot.set_webhook(url=settings.webhook_url, secret_token=settings.webhook_secret, allowed_updates=allowed_updates)
+            watcher = asyncio.create_task(_watch_workers(pool, stopping))
+            logger.info("Supervisor serving webhook for %s workers", settings.workers)
+            await serve(create_webhook_app(settings, accept), settings, stopping)
+            await watcher
+        else:
+            logger.info("Supervisor polling updates for %s workers", settings.workers)
+            await _poll_updates(bot, pool, allowed_updates, stopping)
+    finally:
+        await pool.stop()
+        await bot.session.close()